@@ -0,0 +1,222 @@
+
+"""
+Load test for the FastAPI backend.
+
+Starts `backend.main:app` with uvicorn on a fresh SQLite database in a
+temporary directory, with inference replaced by a stub of configurable latency,
+then runs virtual users at increasing concurrency. Each user loops over:
+login, /auth/me, create an exam, upload copies, list them, correct one and poll
+its grade and annotations.
+
+Reports p50/p95/p99 latency per endpoint and the throughput at every
+concurrency level.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.load_test --concurrency 1 4 16 64 --duration 15 --inference_latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import uvicorn
+
+PROFESSOR = {"username": "professor@example.com", "password": "professor123"}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def install_inference_stub(latency: float, jitter: float):
+    """Replace the Dolphin extraction and grading by a sleep of `latency` +- `jitter` seconds"""
+    from backend.features.correction import service
+
+    def correct_copy(copy_path: str) -> Dict:
+        time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        return {
+            "score": round(random.uniform(0, 20), 2),
+            "annotations": {"q1": "good", "q2": "partial"},
+            "elements": [{"page": 1, "label": "para", "bbox": [0, 0, 100, 20], "text": "stub", "reading_order": 0}],
+            "competencies": {"analysis": 4, "knowledge": 5},
+        }
+
+    service.IAService.correct_copy = staticmethod(correct_copy)
+
+
+class ServerThread(threading.Thread):
+    def __init__(self, app, port: int):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+
+    def run(self):
+        self.server.run()
+
+    def __enter__(self):
+        self.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.join()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, deadline: float, copies_per_exam: int,
+                       polls: int) -> int:
+    """Run the scenario until the deadline, returns the number of completed iterations"""
+    api = "/api/v1"
+    iterations = 0
+    while time.perf_counter() < deadline:
+        response = await recorder.request(client, "POST /auth/login", "POST", f"{api}/auth/login", data=PROFESSOR)
+        if response is None:
+            continue
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await recorder.request(client, "GET /auth/me", "GET", f"{api}/auth/me", headers=headers)
+
+        response = await recorder.request(client, "POST /exams", "POST", f"{api}/exams/", headers=headers,
+                                          json={"course": f"Load test {random.randint(0, 999)}", "date": "2025-06-01"})
+        if response is None:
+            continue
+        exam_id = response.json()["examId"]
+
+        files = [("files", (f"copy_{i}.pdf", b"%PDF-1.4 load test", "application/pdf")) for i in range(copies_per_exam)]
+        response = await recorder.request(client, "POST /exams/{id}/copies", "POST", f"{api}/exams/{exam_id}/copies",
+                                          headers=headers, files=files)
+        if response is None:
+            continue
+        copy_id = response.json()["first_copy_id"]
+
+        await recorder.request(client, "GET /exams/{id}/copies", "GET", f"{api}/exams/{exam_id}/copies",
+                               headers=headers)
+        await recorder.request(client, "POST /copies/{id}/correct", "POST",
+                               f"{api}/exams/{exam_id}/copies/{copy_id}/correct", headers=headers)
+        for _ in range(polls):
+            await recorder.request(client, "GET /copies/{id}/grade", "GET",
+                                   f"{api}/exams/{exam_id}/copies/{copy_id}/grade", headers=headers)
+            await recorder.request(client, "GET /copies/{id}/annotations", "GET",
+                                   f"{api}/exams/{exam_id}/copies/{copy_id}/annotations", headers=headers)
+        iterations += 1
+    return iterations
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, copies_per_exam: int, polls: int) -> Dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        iterations = await asyncio.gather(*[
+            virtual_user(client, recorder, deadline, copies_per_exam, polls) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = sorted(recorder.latencies[name])
+        endpoints[name] = {
+            "count": len(latencies),
+            "errors": recorder.errors[name],
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "rps": len(latencies) / elapsed,
+        }
+    total_requests = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "iterations": sum(iterations),
+        "requests": total_requests,
+        "requests_per_sec": total_requests / elapsed,
+        "iterations_per_sec": sum(iterations) / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+def print_level(result: Dict):
+    print(f"\n=== concurrency {result['concurrency']}: {result['requests_per_sec']:.1f} req/s, "
+          f"{result['iterations_per_sec']:.2f} scenarios/s ({result['iterations']} in {result['elapsed_s']:.1f} s)")
+    print(f"{'endpoint':<32}{'count':>7}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}")
+    for name, endpoint in result["endpoints"].items():
+        print(f"{name:<32}{endpoint['count']:>7}{endpoint['errors']:>7}{endpoint['p50_ms']:>9.1f}"
+              f"{endpoint['p95_ms']:>9.1f}{endpoint['p99_ms']:>9.1f}{endpoint['rps']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the exam correction backend")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Concurrent virtual users, one run per value")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency level")
+    parser.add_argument("--inference_latency", type=float, default=0.5, help="Seconds taken by the inference stub")
+    parser.add_argument("--inference_jitter", type=float, default=0.1, help="Random +- variation of the stub latency")
+    parser.add_argument("--copies_per_exam", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=3, help="Grade/annotations polls after each correction")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output_json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # The database is created in the working directory, keep it away from the real one
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    # Relative to where the benchmark was started, not to the temporary working directory
+    if args.output_json:
+        args.output_json = os.path.abspath(args.output_json)
+    work_dir = tempfile.mkdtemp(prefix="load_test_")
+    os.chdir(work_dir)
+    print(f"Working directory: {work_dir}")
+
+    from backend.main import app
+
+    install_inference_stub(args.inference_latency, args.inference_jitter)
+
+    results = []
+    with ServerThread(app, args.port):
+        base_url = f"http://127.0.0.1:{args.port}"
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_level(base_url, concurrency, args.duration, args.copies_per_exam, args.polls))
+            print_level(result)
+            results.append(result)
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
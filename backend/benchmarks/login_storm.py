@@ -0,0 +1,156 @@
+
+"""
+Login storm benchmark for the FastAPI backend.
+
+Reproduces the start of an exam session: `--logins` students log in at once,
+at most `--concurrency` at a time, while a probe keeps polling a cheap
+authenticated endpoint. Reports the login latency and throughput, and the
+probe latency during the storm, which shows whether password hashing starves
+the other requests.
+
+Accounts are created with the argon2 parameters of the settings. With
+`--legacy_hashes` they are created with passlib's default parameters instead,
+so every login of the storm also rehashes the password.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.login_storm --logins 300 --concurrency 100 --hash_workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from backend.benchmarks.load_test import Recorder, ServerThread, percentile
+
+PASSWORD = "student-password"
+
+
+def create_students(count: int, legacy_hashes: bool) -> List[str]:
+    from passlib.context import CryptContext
+    from sqlmodel import Session
+
+    from backend.core.database import create_db_and_tables, engine
+    from backend.core.security import pwd_context
+    from backend.features.auth.models import User, UserRole
+
+    create_db_and_tables()
+    context = CryptContext(schemes=["argon2"]) if legacy_hashes else pwd_context
+    # Every student has the same password, hash it once
+    hashed_password = context.hash(PASSWORD)
+    emails = [f"student{index}@example.com" for index in range(count)]
+    with Session(engine) as session:
+        for email in emails:
+            session.add(User(email=email, role=UserRole.STUDENT, hashed_password=hashed_password))
+        session.commit()
+    return emails
+
+
+async def probe(client: httpx.AsyncClient, recorder: Recorder, token: str, stop: asyncio.Event, interval: float):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        await recorder.request(client, "probe GET /auth/me", "GET", "/api/v1/auth/me", headers=headers)
+        await asyncio.sleep(interval)
+
+
+async def run_storm(base_url: str, emails: List[str], concurrency: int, probe_interval: float) -> Dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300.0) as client:
+        response = await client.post("/api/v1/auth/login", data={"username": emails[0], "password": PASSWORD})
+        response.raise_for_status()
+        probe_token = response.json()["access_token"]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(email: str):
+            async with semaphore:
+                await recorder.request(client, "POST /auth/login", "POST", "/api/v1/auth/login",
+                                       data={"username": email, "password": PASSWORD})
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, recorder, probe_token, stop, probe_interval))
+        start = time.perf_counter()
+        await asyncio.gather(*[login(email) for email in emails])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    endpoints = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = sorted(recorder.latencies[name])
+        endpoints[name] = {
+            "count": len(latencies),
+            "errors": recorder.errors[name],
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return {
+        "logins": len(emails),
+        "elapsed_s": elapsed,
+        "logins_per_sec": len(emails) / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+def print_storm(result: Dict):
+    print(f"\n{result['logins']} logins in {result['elapsed_s']:.1f} s: {result['logins_per_sec']:.1f} logins/s")
+    print(f"{'endpoint':<24}{'count':>7}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, endpoint in result["endpoints"].items():
+        print(f"{name:<24}{endpoint['count']:>7}{endpoint['errors']:>7}{endpoint['p50_ms']:>9.1f}"
+              f"{endpoint['p95_ms']:>9.1f}{endpoint['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a storm of concurrent logins")
+    parser.add_argument("--logins", type=int, default=300, help="Students logging in, each once")
+    parser.add_argument("--concurrency", type=int, default=100, help="Logins in flight at the same time")
+    parser.add_argument("--hash_workers", type=int, default=None, help="PASSWORD_HASH_WORKERS of the server")
+    parser.add_argument("--legacy_hashes", action="store_true",
+                        help="Create the accounts with passlib's default argon2 parameters, rehashed at login")
+    parser.add_argument("--probe_interval", type=float, default=0.05, help="Seconds between two probe requests")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output_json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # Read by the settings, before the app is imported
+    if args.hash_workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+
+    # The database is created in the working directory, keep it away from the real one
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    # Relative to where the benchmark was started, not to the temporary working directory
+    if args.output_json:
+        args.output_json = os.path.abspath(args.output_json)
+    work_dir = tempfile.mkdtemp(prefix="login_storm_")
+    os.chdir(work_dir)
+    print(f"Working directory: {work_dir}")
+
+    from backend.main import app
+    from backend.core.config import settings
+
+    emails = create_students(args.logins, args.legacy_hashes)
+    print(f"argon2id t={settings.ARGON2_TIME_COST} m={settings.ARGON2_MEMORY_COST} KiB "
+          f"p={settings.ARGON2_PARALLELISM}, {settings.PASSWORD_HASH_WORKERS} hash workers")
+
+    with ServerThread(app, args.port):
+        result = asyncio.run(run_storm(f"http://127.0.0.1:{args.port}", emails, args.concurrency,
+                                       args.probe_interval))
+    print_storm(result)
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"config": vars(args), "result": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+
+"""
+Startup time benchmark for the FastAPI backend.
+
+Each run starts a fresh interpreter in an empty working directory and measures
+the import of `backend.main`, the startup event (tables, default users,
+statistics backfill) and the first `/health` response, which is when a worker
+can take traffic. It also lists the heavy inference modules (torch,
+transformers, cv2, pymupdf) loaded by then, and their resident memory.
+
+With `--eager_inference` the inference stack is imported right after the app,
+as every worker did before it was loaded lazily, to compare the two.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.startup_time --runs 5
+    python -m backend.benchmarks.startup_time --runs 5 --eager_inference
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+HEAVY_MODULES = ["torch", "transformers", "cv2", "fitz"]
+
+# Runs in the child interpreter, prints one JSON line of measurements
+CHILD_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+if EAGER_INFERENCE:
+    from backend.features.correction.inference import load_dolphin
+    load_dolphin()
+eager_loaded = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    started = time.perf_counter()
+    health = client.get("/health")
+    healthy = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "eager_inference_s": eager_loaded - imported,
+    "startup_s": started - eager_loaded,
+    "first_health_s": healthy - start,
+    "health": health.json(),
+    "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def run_once(repo_root: str, eager_inference: bool, preload: bool) -> Dict:
+    script = f"EAGER_INFERENCE = {eager_inference}\nHEAVY_MODULES = {HEAVY_MODULES!r}\n" + CHILD_SCRIPT
+    env = dict(os.environ, PYTHONPATH=repo_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env["INFERENCE_PRELOAD"] = "true" if preload else "false"
+    # Fresh database each run, in the working directory as the app expects
+    with tempfile.TemporaryDirectory(prefix="startup_time_") as work_dir:
+        output = subprocess.run([sys.executable, "-c", script], cwd=work_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    summary = {
+        name: statistics.median(run[name] for run in runs)
+        for name in ["import_s", "eager_inference_s", "startup_s", "first_health_s", "max_rss_mb"]
+    }
+    summary["heavy_modules"] = runs[-1]["heavy_modules"]
+    summary["inference"] = runs[-1]["health"]["inference"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the backend")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters started, the median is reported")
+    parser.add_argument("--eager_inference", action="store_true",
+                        help="Import the inference stack at startup, as before lazy loading")
+    parser.add_argument("--preload", action="store_true", help="Start the workers with INFERENCE_PRELOAD")
+    parser.add_argument("--output_json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    runs = [run_once(repo_root, args.eager_inference, args.preload) for _ in range(args.runs)]
+    summary = summarize(runs)
+
+    print(f"Median of {args.runs} runs")
+    print(f"  import backend.main   {summary['import_s'] * 1000:>9.0f} ms")
+    if args.eager_inference:
+        print(f"  import inference      {summary['eager_inference_s'] * 1000:>9.0f} ms")
+    print(f"  startup event         {summary['startup_s'] * 1000:>9.0f} ms")
+    print(f"  first /health         {summary['first_health_s'] * 1000:>9.0f} ms")
+    print(f"  max RSS               {summary['max_rss_mb']:>9.0f} MB")
+    print(f"  heavy modules loaded  {', '.join(summary['heavy_modules']) or 'none'}")
+    print(f"  inference             {summary['inference']['state']}")
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"config": vars(args), "summary": summary, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,33 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "supersecretkey" # TODO: Change in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens renew access tokens without the password, each is single use
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Users looked up by authenticated requests are cached this long, 0 disables the cache
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_SIZE: int = 1024
+
+    # argon2id cost of password hashes (memory in KiB), the OWASP baseline by default.
+    # Hashes made with other parameters are rehashed at the next successful login.
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 19456
+    ARGON2_PARALLELISM: int = 1
+    # Threads hashing and verifying passwords, a login storm queues on them instead of
+    # taking the request threadpool; each needs ARGON2_MEMORY_COST while hashing
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Inference backend used for document extraction: "hf", "vllm" or "tensorrt"
+    INFERENCE_BACKEND: str = "hf"
+    DOLPHIN_MODEL_PATH: str = "ByteDance/Dolphin-1.5"
+    # Base URL(s) of the vLLM / TensorRT-LLM api_server for the remote backends,
+    # several replicas can be given separated by commas
+    INFERENCE_SERVER_URL: str = "http://localhost:8001"
+    INFERENCE_MAX_CONCURRENCY: int = 16
+    INFERENCE_TIMEOUT: float = 300.0
+    INFERENCE_MAX_TOKENS: int = 4096
+    # The inference stack is imported by the first correction; with this set, a background
+    # thread loads it at startup instead (the API is ready before it finishes)
+    INFERENCE_PRELOAD: bool = False
     
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
 
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "database.db"
@@ -13,3 +14,26 @@ def get_session():
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    add_missing_indexes()
+
+def add_missing_columns():
+    # create_all does not alter existing tables: add the nullable columns added to the models since
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+def add_missing_indexes():
+    # Likewise for the indexes added to existing tables
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
@@ -0,0 +1,92 @@
+
+import hashlib
+import json
+from typing import Any, List, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import literal_column
+from sqlmodel import Session, SQLModel, select
+
+# Largest page a list endpoint returns, whatever the requested limit
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def rowid_column(model: Type[SQLModel]):
+    # SQLite rowid of the model's table: increases with each insert, so it orders rows by creation
+    return literal_column(f'"{model.__tablename__}".rowid')
+
+def paginate(session: Session, statement, model: Type[SQLModel], limit: Optional[int],
+             after: Optional[str]) -> Tuple[List[Any], Optional[str]]:
+    """Keyset pagination of `statement`, a select of `model`, in creation order
+
+    Returns (rows, next cursor). The cursor is the rowid of the last row, pass
+    it back as `after` for the next page; it is None on the last page. Without
+    a limit every row is returned, in the order lists had before pagination
+    existed (a table scan returns rows by rowid).
+    """
+    rowid = rowid_column(model)
+    statement = statement.order_by(rowid)
+    if after is not None:
+        try:
+            statement = statement.where(rowid > int(after))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if limit is None:
+        return session.exec(statement).all(), None
+    # One extra row tells whether there is a next page
+    rows = session.exec(statement.limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    cursor = session.exec(select(rowid).where(model.id == rows[-1].id)).one()
+    return rows, str(cursor)
+
+def parse_fields(fields: Optional[str], model: Type[SQLModel]) -> Optional[set]:
+    # "id,grade" -> {"id", "grade"}, None keeps every field of the response model
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return selected
+
+def list_response(request: Request, rows: Sequence[Any], model: Type[SQLModel], fields: Optional[str] = None,
+                  next_cursor: Optional[str] = None) -> Response:
+    """JSON response of `rows` serialized with `model`, with a weak ETag
+
+    A request whose If-None-Match holds the current ETag gets an empty 304, so
+    clients polling a list do not download it again while it is unchanged.
+    """
+    include = parse_fields(fields, model)
+    items = [model.model_validate(row).model_dump(mode="json", include=include) for row in rows]
+    body = json.dumps(items, separators=(",", ":")).encode("utf-8")
+
+    # The page content and its cursor together identify the representation
+    digest = hashlib.sha1(body)
+    digest.update((next_cursor or "").encode("utf-8"))
+    etag = f'W/"{digest.hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
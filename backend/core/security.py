@@ -1,11 +1,26 @@
 
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
-from jose import jwt
+from typing import Any, Dict, Optional, Tuple, Union
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 from backend.core.config import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# argon2-cffi releases the GIL, the hashes of this pool run in parallel with the event loop and each other
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -13,12 +28,52 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the password hashing pool
+
+    Returns (valid, new hash). The new hash is set when the password is valid
+    but was hashed with other argon2 parameters than the current ones.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[Dict[str, Any]] = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # Extra signed claims, e.g. the user id and role, so requests can be authorized without a lookup
+    to_encode = dict(claims or {})
+    to_encode.update({"exp": expire, "sub": str(subject)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+def create_refresh_token(subject: Union[str, Any], claims: Optional[Dict[str, Any]] = None, family: Optional[str] = None) -> str:
+    """Single use refresh token
+
+    All the tokens obtained from one login by rotation share its `family`, so
+    they can be revoked together on logout or when a used one is replayed.
+    """
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = dict(claims or {})
+    to_encode.update({
+        "exp": expire,
+        "sub": str(subject),
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "family": family or uuid.uuid4().hex,
+    })
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_refresh_token(token: str) -> Optional[Dict[str, Any]]:
+    # Claims of a valid refresh token, None for anything else (including access tokens)
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh" or not all(payload.get(key) for key in ("sub", "jti", "family")):
+        return None
+    return payload
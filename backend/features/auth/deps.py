@@ -1,21 +1,26 @@
 
-from typing import Annotated
+from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlmodel import Session
+from sqlmodel import Session, SQLModel
 
 from backend.core.database import get_session
 from backend.core.config import settings
-from backend.features.auth.models import User
-from backend.features.auth.service import get_user_by_email
+from backend.features.auth.models import User, UserRole
+from backend.features.auth.service import get_user_by_email, get_user_by_id_cached
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(
-    session: Annotated[Session, Depends(get_session)],
+class TokenClaims(SQLModel):
+    # Signed claims of an access token, enough to authorize a request without the database
+    sub: str
+    uid: Optional[int] = None
+    role: Optional[UserRole] = None
+
+def get_token_claims(
     token: Annotated[str, Depends(oauth2_scheme)]
-) -> User:
+) -> TokenClaims:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -23,15 +28,28 @@ def get_current_user(
     )
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        # Refresh tokens are only accepted by /auth/refresh
+        if payload.get("sub") is None or payload.get("type") == "refresh":
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_email(session, email=email)
-    if user is None:
+        return TokenClaims(sub=payload["sub"], uid=payload.get("uid"), role=payload.get("role"))
+    except (JWTError, ValueError):
         raise credentials_exception
+
+def get_current_user(
+    session: Annotated[Session, Depends(get_session)],
+    claims: Annotated[TokenClaims, Depends(get_token_claims)]
+) -> User:
+    # Tokens issued before they carried the user id are looked up by email
+    if claims.uid is not None:
+        user = get_user_by_id_cached(session, claims.uid)
+    else:
+        user = get_user_by_email(session, email=claims.sub)
+    if user is None or user.email != claims.sub:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 def get_current_active_user(
@@ -1,5 +1,6 @@
 
 from typing import Optional
+from datetime import datetime
 from sqlmodel import Field, SQLModel
 from enum import Enum
 
@@ -26,3 +27,13 @@ class UserRead(UserBase):
 class Token(SQLModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(SQLModel):
+    refresh_token: str
+
+class RevokedToken(SQLModel, table=True):
+    # A used refresh token ("jti:<id>") or a revoked token family ("family:<id>").
+    # Kept until the tokens it refers to expire anyway.
+    id: str = Field(primary_key=True)
+    expires_at: datetime = Field(index=True)
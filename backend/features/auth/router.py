@@ -1,36 +1,54 @@
 
-from datetime import timedelta
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
 
 from backend.core.database import get_session
-from backend.core.config import settings
-from backend.core.security import create_access_token
-from backend.features.auth.models import UserRead, Token, User
+from backend.features.auth.models import UserRead, Token, User, RefreshRequest
 from backend.features.auth import service
 from backend.features.auth.deps import get_current_active_user
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     session: Annotated[Session, Depends(get_session)],
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ):
-    user = service.authenticate_user(session, form_data.username, form_data.password)
+    # async: a login waiting for argon2 does not hold a threadpool thread
+    user = await service.authenticate_user(session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.email, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return service.create_tokens(user)
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(
+    session: Annotated[Session, Depends(get_session)],
+    refresh_request: RefreshRequest,
+):
+    # A signature check and two primary key operations, no password verification
+    tokens = service.rotate_refresh_token(session, refresh_request.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    session: Annotated[Session, Depends(get_session)],
+    refresh_request: RefreshRequest,
+):
+    # The access token stays valid until it expires, ACCESS_TOKEN_EXPIRE_MINUTES at most
+    service.revoke_refresh_token(session, refresh_request.refresh_token)
+    return None
 
 @router.get("/me", response_model=UserRead)
 def read_users_me(
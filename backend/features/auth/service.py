@@ -1,7 +1,22 @@
 
-from sqlmodel import Session, select
-from backend.features.auth.models import User, UserCreate
-from backend.core.security import get_password_hash, verify_password
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, delete, select
+from starlette.concurrency import run_in_threadpool
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.features.auth.models import RevokedToken, Token, User, UserCreate
+from backend.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
+    get_password_hash,
+    verify_and_update_password,
+)
+
+# Users of authenticated requests by id, call invalidate_user whenever a user is changed or deleted
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
 
 def create_user(session: Session, user_create: UserCreate) -> User:
     # Build User explicitly to avoid validation error on missing hashed_password
@@ -14,16 +29,104 @@ def create_user(session: Session, user_create: UserCreate) -> User:
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    # SQLite may reuse the id of a deleted user
+    invalidate_user(db_user.id)
     return db_user
 
 def get_user_by_email(session: Session, email: str) -> User | None:
     statement = select(User).where(User.email == email)
     return session.exec(statement).first()
 
-def authenticate_user(session: Session, email: str, password: str) -> User | None:
-    user = get_user_by_email(session, email)
+async def authenticate_user(session: Session, email: str, password: str) -> User | None:
+    # The lookup runs on the request threadpool and argon2 on its own pool, never on the event loop
+    user = await run_in_threadpool(get_user_by_email, session, email)
+    # Give the connection back to the pool while argon2 runs, a login storm would exhaust it
+    await run_in_threadpool(session.close)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Hashed with other argon2 parameters than the current ones
+        await run_in_threadpool(update_password_hash, session, user, new_hash)
+    return user
+
+def update_password_hash(session: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    invalidate_user(user.id)
+
+def get_user_by_id_cached(session: Session, user_id: int) -> Optional[User]:
+    user = user_cache.get(user_id)
+    if user is None:
+        user = session.get(User, user_id)
+        if user is None:
+            return None
+        # Detached copy: the cached user outlives the session and is shared between requests
+        user = User.model_validate(user.model_dump())
+        user_cache.set(user_id, user)
     return user
+
+def invalidate_user(user_id: Optional[int]) -> None:
+    user_cache.invalidate(user_id)
+
+def create_tokens(user: User, family: Optional[str] = None) -> Token:
+    # Access token with the claims get_current_user relies on, and the next refresh token of `family`
+    claims = {"uid": user.id, "role": user.role.value}
+    access_token = create_access_token(
+        subject=user.email,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        claims=claims,
+    )
+    refresh_token = create_refresh_token(subject=user.email, claims=claims, family=family)
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+def _revoke(session: Session, revoked_id: str, expires_at: datetime) -> bool:
+    # False if it was already revoked; a primary key insert, atomic across workers
+    statement = sqlite_insert(RevokedToken).values(id=revoked_id, expires_at=expires_at).on_conflict_do_nothing()
+    return session.exec(statement).rowcount == 1
+
+def rotate_refresh_token(session: Session, refresh_token: str) -> Optional[Token]:
+    """New token pair for a refresh token, which cannot be used again
+
+    Replaying a refresh token that was already used means it leaked: every
+    token of its family is revoked, the legitimate client logs in again.
+    """
+    payload = decode_refresh_token(refresh_token)
+    if payload is None:
+        return None
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+    family_id = f"family:{payload['family']}"
+    if session.get(RevokedToken, family_id) is not None:
+        return None
+    if not _revoke(session, f"jti:{payload['jti']}", expires_at):
+        # Outlives every token of the family, they are all issued for at most this long
+        _revoke(session, family_id, datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+        session.commit()
+        return None
+    session.commit()
+
+    # The user's current role goes into the new tokens, deleted users cannot renew
+    uid = payload.get("uid")
+    user = get_user_by_id_cached(session, uid) if uid is not None else get_user_by_email(session, payload["sub"])
+    if user is None or user.email != payload["sub"]:
+        return None
+    return create_tokens(user, family=payload["family"])
+
+def revoke_refresh_token(session: Session, refresh_token: str) -> bool:
+    # Logout: the refresh token and all the ones rotated from the same login
+    payload = decode_refresh_token(refresh_token)
+    if payload is None:
+        return False
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    _revoke(session, f"family:{payload['family']}", expires_at)
+    session.commit()
+    return True
+
+def purge_revoked_tokens(session: Session) -> None:
+    # Revocations of expired tokens are not needed anymore
+    session.exec(delete(RevokedToken).where(RevokedToken.expires_at < datetime.now(timezone.utc)))
+    session.commit()
@@ -0,0 +1,249 @@
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+# Add dolphin_tools directory to sys.path to allow internal imports (like utils) to work
+dolphin_tools_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../dolphin_tools"))
+if dolphin_tools_path not in sys.path:
+    sys.path.append(dolphin_tools_path)
+
+# Standard library and httpx only, cheap to import with the app
+from deployment.client_pool import ClientPool
+from utils.manifest import PageCache, file_fingerprint
+from utils.tracing import RecordingTracer
+
+# demo_page imports torch, transformers, cv2 and pymupdf: several seconds and
+# hundreds of MB, so it is only imported by the first correction
+_dolphin_module = None
+_dolphin_error: Optional[str] = None
+_dolphin_lock = threading.Lock()
+
+
+def load_dolphin():
+    """The demo_page module, imported on first call; None if dolphin_tools or its dependencies are missing"""
+    global _dolphin_module, _dolphin_error
+    if _dolphin_module is not None or _dolphin_error is not None:
+        return _dolphin_module
+    with _dolphin_lock:
+        if _dolphin_module is None and _dolphin_error is None:
+            try:
+                import demo_page
+                _dolphin_module = demo_page
+            except ImportError as e:
+                # Fallback if path mapping fails or dependencies missing
+                print(f"Warning: dolphin_tools not found or dependencies missing (demo_page), using stub: {e}")
+                _dolphin_error = str(e)
+    return _dolphin_module
+
+
+def get_process_document() -> Optional[Callable]:
+    dolphin = load_dolphin()
+    return dolphin.process_document if dolphin is not None else None
+
+
+def preload_inference() -> None:
+    # Import the inference stack and create the backend ahead of the first correction
+    load_dolphin()
+    get_inference_backend()
+
+
+class InferenceBackend:
+    """
+    Base class for Dolphin inference backends.
+
+    Backends expose the same `chat(prompt, image)` contract as `DOLPHIN.chat`,
+    so `process_document` can drive any of them unchanged.
+    """
+
+    def chat(self, prompt, image):
+        is_batch = isinstance(image, list)
+        if not is_batch:
+            images = [image]
+            prompts = [prompt]
+        else:
+            images = image
+            prompts = prompt if isinstance(prompt, list) else [prompt] * len(images)
+
+        results = self.generate(prompts, images)
+        if not is_batch:
+            return results[0]
+        return results
+
+    def generate(self, prompts: List[str], images: List) -> List[str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class HFInferenceBackend(InferenceBackend):
+    """Runs the Hugging Face model in-process."""
+
+    def __init__(self, model_path: str):
+        dolphin = load_dolphin()
+        if dolphin is None:
+            raise RuntimeError("dolphin_tools is not available, cannot load the in-process model")
+        self.model = dolphin.DOLPHIN(model_path)
+
+    def generate(self, prompts: List[str], images: List) -> List[str]:
+        return self.model.chat(prompts, images)
+
+
+class RemoteInferenceBackend(InferenceBackend):
+    """
+    Base class for backends talking to remote inference servers.
+
+    Requests are balanced over the server replicas by a `ClientPool`, shared by
+    a thread pool so the elements of a batch are sent concurrently over
+    kept-alive connections.
+    """
+
+    def __init__(self, server_urls: List[str], max_concurrency: int, timeout: float):
+        self.pool = ClientPool(server_urls, timeout=timeout, max_connections_per_replica=max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="inference")
+
+    def generate(self, prompts: List[str], images: List) -> List[str]:
+        return list(self.executor.map(self.generate_one, prompts, images))
+
+    def generate_one(self, prompt: str, image) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+    @staticmethod
+    def encode_image(image) -> Tuple[bytes, List[int]]:
+        # Send raw RGB pixels: the crops are already decoded, so PNG encoding
+        # them only to be decoded again on the server is wasted work
+        image = image.convert("RGB")
+        return image.tobytes(), [image.height, image.width, 3]
+
+    @staticmethod
+    def clean_output(text: str, prompt: str) -> str:
+        return text.replace(f"<s>{prompt.strip()} <Answer/>", "").replace("<pad>", "").replace("</s>", "").strip()
+
+
+class VLLMInferenceBackend(RemoteInferenceBackend):
+    """
+    Client for `deployment/vllm/api_server.py`.
+
+    Batches are sent in a single `/generate_batch_raw` call; the server schedules
+    all pairs together, so no client-side fan-out is needed.
+    """
+
+    def generate(self, prompts: List[str], images: List) -> List[str]:
+        encoded_images = [self.encode_image(image) for image in images]
+        params = {
+            "requests": [
+                {
+                    "encoder_prompt": "",
+                    "decoder_prompt": prompt,
+                    "image_shape": image_shape,
+                }
+                for prompt, (_, image_shape) in zip(prompts, encoded_images)
+            ],
+            "temperature": 0.0,
+            "max_tokens": settings.INFERENCE_MAX_TOKENS,
+            "skip_special_tokens": False,
+        }
+        response = self.pool.post(
+            "/generate_batch_raw",
+            content=b"".join(image_data for image_data, _ in encoded_images),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Generate-Params": json.dumps(params),
+            },
+        )
+        response.raise_for_status()
+        return [
+            self.clean_output(text_outputs[0], prompt)
+            for prompt, text_outputs in zip(prompts, response.json()["text"])
+        ]
+
+    def generate_one(self, prompt: str, image) -> str:
+        return self.generate([prompt], [image])[0]
+
+
+class TensorRTInferenceBackend(RemoteInferenceBackend):
+    """Client for the TensorRT-LLM `LlmServer` in `deployment/tensorrt_llm/api_server.py`."""
+
+    def generate_one(self, prompt: str, image) -> str:
+        image_data, image_shape = self.encode_image(image)
+        response = self.pool.post(
+            "/generate_raw",
+            content=image_data,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Image-Shape": ",".join(str(dim) for dim in image_shape),
+                "X-Generate-Params": json.dumps({
+                    "prompt": prompt,
+                    "max_new_tokens": settings.INFERENCE_MAX_TOKENS,
+                }),
+            },
+        )
+        response.raise_for_status()
+        return self.clean_output(response.json()["text"], prompt)
+
+
+def create_inference_backend(name: str) -> InferenceBackend:
+    if name == "hf":
+        return HFInferenceBackend(settings.DOLPHIN_MODEL_PATH)
+    # INFERENCE_SERVER_URL may list several replicas, separated by commas
+    server_urls = [url.strip() for url in settings.INFERENCE_SERVER_URL.split(",") if url.strip()]
+    if name == "vllm":
+        return VLLMInferenceBackend(server_urls, settings.INFERENCE_MAX_CONCURRENCY, settings.INFERENCE_TIMEOUT)
+    if name == "tensorrt":
+        return TensorRTInferenceBackend(server_urls, settings.INFERENCE_MAX_CONCURRENCY, settings.INFERENCE_TIMEOUT)
+    raise ValueError(f"Unknown inference backend: {name}")
+
+
+# Global backend instance, created on first use
+_inference_backend: Optional[InferenceBackend] = None
+_inference_backend_error: Optional[str] = None
+_inference_backend_lock = threading.Lock()
+
+
+def get_inference_backend() -> Optional[InferenceBackend]:
+    global _inference_backend, _inference_backend_error
+    if _inference_backend is not None:
+        return _inference_backend
+    # Concurrent first corrections would otherwise load the model several times
+    with _inference_backend_lock:
+        if _inference_backend is None:
+            try:
+                _inference_backend = create_inference_backend(settings.INFERENCE_BACKEND)
+                _inference_backend_error = None
+            except Exception as e:
+                print(f"Failed to create inference backend '{settings.INFERENCE_BACKEND}': {e}")
+                _inference_backend_error = str(e)
+                return None
+    return _inference_backend
+
+
+def inference_status() -> Dict:
+    """State of the inference stack, without loading anything
+
+    "not_loaded" until the first correction (or the preload) imports it,
+    then "ready" or "unavailable" with the error.
+    """
+    if _inference_backend is not None:
+        state = "ready"
+    elif _dolphin_error is not None or _inference_backend_error is not None:
+        state = "unavailable"
+    elif _dolphin_lock.locked() or _inference_backend_lock.locked():
+        state = "loading"
+    else:
+        state = "not_loaded"
+    return {
+        "backend": settings.INFERENCE_BACKEND,
+        "state": state,
+        "dolphin_imported": _dolphin_module is not None,
+        "error": _dolphin_error or _inference_backend_error,
+    }
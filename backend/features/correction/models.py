@@ -1,5 +1,6 @@
 
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, JSON
 
 class CopyBase(SQLModel):
@@ -8,9 +9,15 @@ class CopyBase(SQLModel):
     file_path: Optional[str] = None
 
 class Copy(CopyBase, table=True):
+    # Median, min and max of the exam reports are read in grade order
+    __table_args__ = (Index("ix_copy_exam_grade", "exam_id", "grade"),)
+
     id: Optional[str] = Field(default=None, primary_key=True) # UUID
     grade: Optional[float] = None
     annotations: Optional[dict] = Field(default=None, sa_type=JSON) 
+    # SHA-256 of the file when it was last corrected, unchanged copies are not corrected again
+    content_hash: Optional[str] = None
+    competencies: Optional[dict] = Field(default=None, sa_type=JSON)
 
 class CopyCreate(CopyBase):
     pass
@@ -19,3 +26,26 @@ class CopyRead(CopyBase):
     id: str
     grade: Optional[float]
     annotations: Optional[dict]
+    competencies: Optional[dict] = None
+
+class CopySummary(CopyBase):
+    # What the list endpoints return: annotations and extracted text are fetched per copy
+    id: str
+    grade: Optional[float]
+
+class ExtractedElementBase(SQLModel):
+    page: int = 1
+    reading_order: int = 0
+    label: str
+    bbox: List[int] = Field(sa_type=JSON)
+    text: str = ""
+
+class ExtractedElement(ExtractedElementBase, table=True):
+    # One row per layout element extracted from a copy by Dolphin
+    __table_args__ = (Index("ix_extractedelement_copy_page", "copy_id", "page", "reading_order"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    copy_id: str = Field(foreign_key="copy.id")
+
+class ExtractedElementRead(ExtractedElementBase):
+    pass
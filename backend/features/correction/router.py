@@ -1,11 +1,12 @@
 
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File, Query, Request
 from sqlmodel import Session
 
 from backend.core.database import get_session
+from backend.core.pagination import MAX_PAGE_SIZE, list_response
 from backend.features.correction import service
-from backend.features.correction.models import CopyRead, CopyCreate
+from backend.features.correction.models import CopyRead, CopyCreate, CopySummary, ExtractedElementRead
 
 # We use prefix /exams explicitly here or handled in main.py?
 # Spec: /exams/{examId}/copies
@@ -36,12 +37,19 @@ def upload_copies(
         
     return {"uploaded_count": len(created_ids), "first_copy_id": created_ids[0] if created_ids else None}
 
-@router.get("/exams/{exam_id}/copies", response_model=List[CopyRead])
+# Lists only carry the lightweight fields, annotations and elements are fetched per copy
+@router.get("/exams/{exam_id}/copies", response_model=List[CopySummary])
 def list_copies(
     exam_id: str,
+    request: Request,
     session: Annotated[Session, Depends(get_session)],
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
-    return service.get_copies_by_exam(session, exam_id)
+    # Keyset pages (?limit=&after=<X-Next-Cursor>), ?fields=id,grade projection, ETag / If-None-Match
+    copies, next_cursor = service.get_copies_page(session, exam_id, limit, after)
+    return list_response(request, copies, CopySummary, fields, next_cursor)
 
 @router.get("/exams/{exam_id}/copies/{copy_id}", response_model=CopyRead)
 def get_copy(
@@ -54,6 +62,19 @@ def get_copy(
         raise HTTPException(status_code=404, detail="Copy not found")
     return copy
 
+@router.get("/exams/{exam_id}/copies/{copy_id}/elements", response_model=List[ExtractedElementRead])
+def get_copy_elements(
+    exam_id: str,
+    copy_id: str,
+    session: Annotated[Session, Depends(get_session)],
+    page: Optional[int] = None,
+):
+    # Text extracted by Dolphin, in reading order, optionally for a single page
+    copy = service.get_copy(session, copy_id)
+    if not copy:
+        raise HTTPException(status_code=404, detail="Copy not found")
+    return service.get_copy_elements(session, copy_id, page)
+
 @router.post("/exams/{exam_id}/copies/{copy_id}/correct", response_model=CopyRead)
 def correct_copy(
     exam_id: str,
@@ -65,9 +86,11 @@ def correct_copy(
         raise HTTPException(status_code=404, detail="Copy not found")
     return copy
 
-@router.post("/exams/{exam_id}/correct", response_model=List[CopyRead])
+@router.post("/exams/{exam_id}/correct", response_model=List[CopySummary])
 def correct_all(
     exam_id: str,
     session: Annotated[Session, Depends(get_session)],
+    force: bool = False,
 ):
-    return service.correct_all_exam_copies(session, exam_id)
+    # Copies already graded whose file is unchanged are skipped, unless force=true
+    return service.correct_all_exam_copies(session, exam_id, force)
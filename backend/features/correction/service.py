@@ -1,40 +1,18 @@
 
 import uuid
-from typing import List, Dict, Optional
-from sqlmodel import Session, select
-from backend.features.correction.models import Copy, CopyCreate
+from typing import List, Dict, Optional, Tuple
+from sqlmodel import Session, delete, select
+from backend.core.pagination import paginate
+from backend.features.results.service import apply_contributions, copy_contribution
+from backend.features.correction.models import Copy, CopyCreate, ExtractedElement
 import os
-import sys
-
-# Add dolphin_tools directory to sys.path to allow internal imports (like utils) to work
-dolphin_tools_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../dolphin_tools"))
-if dolphin_tools_path not in sys.path:
-    sys.path.append(dolphin_tools_path)
-
-try:
-    # Now we import directly as demo_page is available in path
-    from demo_page import DOLPHIN, process_document
-except ImportError:
-    # Fallback if path mapping fails or dependencies missing
-    print("Warning: dolphin_tools not found or dependencies missing (demo_page), using stub.")
-    DOLPHIN = None
-    process_document = None
-
-# Global model instance (lazy load or singleton recommended for real app)
-_dolphin_model = None
-
-def get_dolphin_model():
-    global _dolphin_model
-    if _dolphin_model is None:
-        # Assuming model path is valid or using HF hub
-        # For this environment, let's assume a default or parameterized path
-        # Warning: This might be heavy to load on startup
-        try:
-             _dolphin_model = DOLPHIN("ByteDance/Dolphin-1.5") # Or local path
-        except Exception as e:
-            print(f"Failed to load Dolphin model: {e}")
-            return None 
-    return _dolphin_model
+from backend.features.correction.inference import (
+    PageCache,
+    RecordingTracer,
+    file_fingerprint,
+    get_inference_backend,
+    get_process_document,
+)
 
 class IAService:
     @staticmethod
@@ -43,51 +21,72 @@ class IAService:
         Corrects a copy by first extracting content using Dolphin, 
         then (stub) grading it.
         """
-        extracted_text = ""
+        elements = []
+        extraction_error = None
+        timings = None
         try:
-            model = get_dolphin_model()
-            if model and os.path.exists(copy_path):
+            # The first correction of the worker imports the inference stack
+            process_document = get_process_document()
+            model = get_inference_backend()
+            if model and process_document and os.path.exists(copy_path):
                 # Temporary output dir for extraction results
                 save_dir = os.path.join(os.path.dirname(copy_path), "extraction_results")
                 
                 # process_document returns (json_path, results_list)
+                # Pages already extracted from a previous version of the copy are reused.
+                # Only the compact columnar file is written, the text is taken from the
+                # returned results and nobody reads the pretty JSON/Markdown here.
+                tracer = RecordingTracer()
                 _, results = process_document(
                     document_path=copy_path,
                     model=model,
-                    save_dir=save_dir
+                    save_dir=save_dir,
+                    tracer=tracer,
+                    page_cache=PageCache(os.path.join(save_dir, "pages")),
+                    output_format="compact",
                 )
-                
-                # Simple aggregation of extracted text for demonstration
-                # results structure depends on if it's PDF (list of pages) or Image
-                if isinstance(results, list) and len(results) > 0 and "elements" in results[0]:
-                     # Multi-page PDF structure from process_document
-                     for page in results:
-                         for element in page.get("elements", []):
-                             extracted_text += element.get("text", "") + "\n"
-                elif isinstance(results, list):
-                    # Single page image results list
-                    for element in results:
-                         extracted_text += element.get("text", "") + "\n"
+                # Per-stage timing breakdown, to find slow copies
+                timings = tracer.timings()
+                elements = flatten_elements(results)
             else:
-                extracted_text = "Dolphin model not loaded or file not found. Using simulation."
+                extraction_error = "Dolphin model not loaded or file not found. Using simulation."
 
         except Exception as e:
             print(f"Error during Dolphin extraction: {e}")
-            extracted_text = "Extraction failed."
+            extraction_error = "Extraction failed."
 
-        # Here we would feed 'extracted_text' to an LLM for grading.
-        # For now, we return the stub plus the extracted text for verification.
+        # Here we would feed the text of 'elements' to an LLM for grading.
+        # For now, we return the stub; the elements are stored in their own table.
         
+        annotations = {
+            "q1": "good", 
+            "q2": "partial"
+        }
+        if extraction_error:
+            annotations["extraction_error"] = extraction_error
+        if timings:
+            annotations["timings"] = timings
+
         return {
             "score": 15.5,
-            "annotations": {
-                "extracted_content": extracted_text[:500] + "...", # Truncate for display
-                "q1": "good", 
-                "q2": "partial"
-            },
-            "competencies": {"analysis": 4, "knowledge": 5}
+            "annotations": annotations,
+            "competencies": {"analysis": 4, "knowledge": 5},
+            "elements": elements,
         }
 
+def flatten_elements(results) -> List[Dict]:
+    """Elements of process_document results, with their page number"""
+    # results structure depends on if it's PDF (list of pages) or Image
+    if isinstance(results, list) and len(results) > 0 and "elements" in results[0]:
+        # Multi-page PDF structure from process_document
+        return [
+            dict(element, page=page["page_number"])
+            for page in results
+            for element in page.get("elements", [])
+        ]
+    # Single page image results list
+    return [dict(element, page=1) for element in results or []]
+
 def create_copy(session: Session, copy_create: CopyCreate) -> Copy:
     db_copy = Copy.from_orm(copy_create)
     db_copy.id = str(uuid.uuid4())
@@ -100,9 +99,53 @@ def get_copies_by_exam(session: Session, exam_id: str) -> List[Copy]:
     statement = select(Copy).where(Copy.exam_id == exam_id)
     return session.exec(statement).all()
 
+def get_copies_page(session: Session, exam_id: str, limit: Optional[int] = None,
+                    after: Optional[str] = None) -> Tuple[List[Copy], Optional[str]]:
+    statement = select(Copy).where(Copy.exam_id == exam_id)
+    return paginate(session, statement, Copy, limit, after)
+
 def get_copy(session: Session, copy_id: str) -> Optional[Copy]:
     return session.get(Copy, copy_id)
 
+def get_copy_elements(session: Session, copy_id: str, page: Optional[int] = None) -> List[ExtractedElement]:
+    statement = select(ExtractedElement).where(ExtractedElement.copy_id == copy_id)
+    if page is not None:
+        statement = statement.where(ExtractedElement.page == page)
+    statement = statement.order_by(ExtractedElement.page, ExtractedElement.reading_order)
+    return session.exec(statement).all()
+
+def replace_copy_elements(session: Session, copy_id: str, elements: List[Dict]) -> None:
+    # Part of the caller's transaction: the old elements go away with the commit storing the new grade
+    session.exec(delete(ExtractedElement).where(ExtractedElement.copy_id == copy_id))
+    session.add_all([
+        ExtractedElement(
+            copy_id=copy_id,
+            page=element.get("page", 1),
+            reading_order=element.get("reading_order", 0),
+            label=element.get("label", ""),
+            bbox=list(element.get("bbox", [0, 0, 0, 0])),
+            text=element.get("text", ""),
+        )
+        for element in elements
+    ])
+
+def get_content_hash(file_path: Optional[str]) -> Optional[str]:
+    if not file_path or not os.path.exists(file_path):
+        return None
+    return file_fingerprint(file_path)["sha256"]
+
+def is_correction_up_to_date(copy: Copy, full_path: Optional[str]) -> bool:
+    # Graded, and the file has not changed since
+    if copy.grade is None or copy.content_hash is None:
+        return False
+    return get_content_hash(full_path) == copy.content_hash
+
+def get_full_path(copy: Copy) -> Optional[str]:
+    full_path = copy.file_path
+    if full_path and not os.path.isabs(full_path):
+        full_path = os.path.abspath(full_path)
+    return full_path
+
 def perform_correction(session: Session, copy_id: str) -> Optional[Copy]:
     copy = session.get(Copy, copy_id)
     if not copy:
@@ -118,23 +161,35 @@ def perform_correction(session: Session, copy_id: str) -> Optional[Copy]:
     
     # Check if file_path is relative and prepend project root if needed
     # (Simplified logic)
-    full_path = copy.file_path
-    if full_path and not os.path.isabs(full_path):
-        full_path = os.path.abspath(full_path)
+    full_path = get_full_path(copy)
 
+    # Hash before correcting: a file replaced during the correction is corrected again next time
+    content_hash = get_content_hash(full_path)
     result = IAService.correct_copy(full_path)
+    # What the previous correction counted for in the exam statistics
+    old_contribution = copy_contribution(copy)
     copy.grade = result["score"]
     copy.annotations = result["annotations"]
+    copy.competencies = result.get("competencies")
+    # A simulated grade (extraction failed or model unavailable) is not up to date, the next run retries it
+    copy.content_hash = None if result["annotations"].get("extraction_error") else content_hash
+    replace_copy_elements(session, copy.id, result.get("elements", []))
+    # Exam statistics are committed together with the grade
+    apply_contributions(session, copy.exam_id, old_contribution, copy_contribution(copy))
     
     session.add(copy)
     session.commit()
     session.refresh(copy)
     return copy
 
-def correct_all_exam_copies(session: Session, exam_id: str) -> List[Copy]:
+def correct_all_exam_copies(session: Session, exam_id: str, force: bool = False) -> List[Copy]:
     copies = get_copies_by_exam(session, exam_id)
     corrected_copies = []
     for copy in copies:
+        # Re-runs (e.g. after a crash half-way) skip the copies already graded and unchanged
+        if not force and is_correction_up_to_date(copy, get_full_path(copy)):
+            corrected_copies.append(copy)
+            continue
         # Ideally async or background task
         perform_correction(session, copy.id)
         corrected_copies.append(copy)
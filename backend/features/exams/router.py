@@ -1,9 +1,10 @@
 
-from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlmodel import Session
 
 from backend.core.database import get_session
+from backend.core.pagination import MAX_PAGE_SIZE, list_response
 from backend.features.exams import service
 from backend.features.exams.models import ExamRead, ExamCreate, ExamUpdate
 
@@ -19,9 +20,15 @@ def create_exam(
 
 @router.get("/", response_model=List[ExamRead])
 def list_exams(
+    request: Request,
     session: Annotated[Session, Depends(get_session)],
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
 ):
-    return service.get_exams(session)
+    # Keyset pages (?limit=&after=<X-Next-Cursor>), ?fields=id,course projection, ETag / If-None-Match
+    exams, next_cursor = service.get_exams_page(session, limit, after)
+    return list_response(request, exams, ExamRead, fields, next_cursor)
 
 @router.get("/{exam_id}", response_model=ExamRead)
 def get_exam(
@@ -1,8 +1,10 @@
 
 import uuid
-from typing import List, Optional
-from sqlmodel import Session, select
+from typing import List, Optional, Tuple
+from sqlmodel import Session, delete, select
+from backend.core.pagination import paginate
 from backend.features.exams.models import Exam, ExamCreate, ExamUpdate
+from backend.features.results.models import ExamStat
 
 def create_exam(session: Session, exam_create: ExamCreate) -> Exam:
     db_exam = Exam.from_orm(exam_create)
@@ -16,6 +18,9 @@ def get_exams(session: Session) -> List[Exam]:
     statement = select(Exam)
     return session.exec(statement).all()
 
+def get_exams_page(session: Session, limit: Optional[int] = None, after: Optional[str] = None) -> Tuple[List[Exam], Optional[str]]:
+    return paginate(session, select(Exam), Exam, limit, after)
+
 def get_exam(session: Session, exam_id: str) -> Optional[Exam]:
     return session.get(Exam, exam_id)
 
@@ -37,6 +42,8 @@ def delete_exam(session: Session, exam_id: str) -> bool:
     db_exam = session.get(Exam, exam_id)
     if not db_exam:
         return False
+    # The statistics go away with the exam, in the same transaction
+    session.exec(delete(ExamStat).where(ExamStat.exam_id == exam_id))
     session.delete(db_exam)
     session.commit()
     return True
@@ -0,0 +1,11 @@
+
+from sqlmodel import Field, SQLModel
+
+class ExamStat(SQLModel, table=True):
+    # One aggregate of the graded copies of an exam, e.g. key "grade" or "competency:analysis".
+    # Updated by increments in the transaction that stores each correction.
+    exam_id: str = Field(foreign_key="exam.id", primary_key=True)
+    key: str = Field(primary_key=True)
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
@@ -1,11 +1,14 @@
 
 from typing import Annotated, List, Dict
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 
 from backend.core.database import get_session
 from backend.features.correction.service import get_copy
 from backend.features.correction.models import CopyRead
+from backend.features.exams.service import get_exam
+from backend.features.results import service
 
 # Results router:
 # GET /exams/{examId}/copies/{copyId}/grade
@@ -31,12 +34,22 @@ def get_exam_report(
     session: Annotated[Session, Depends(get_session)],
     type: str = "summary",
 ):
-    detailed = (type == "detailed")
-    # Placeholder logic
+    if type not in ("summary", "detailed"):
+        raise HTTPException(status_code=400, detail="type must be 'summary' or 'detailed'")
+    if not get_exam(session, exam_id):
+        raise HTTPException(status_code=404, detail="Exam not found")
+    if type == "detailed":
+        # One CSV row per copy, streamed
+        return StreamingResponse(
+            service.iter_report_csv(exam_id),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="report_{exam_id}.csv"'},
+        )
+    # Statistics maintained as copies are corrected, not recomputed from every copy
     return {
         "exam_id": exam_id,
         "type": type,
-        "report": "detailed report" if detailed else "summary report"
+        "report": service.get_exam_report(session, exam_id),
     }
 
 @router.get("/exams/{exam_id}/copies/{copy_id}/annotations")
@@ -0,0 +1,229 @@
+
+import csv
+import io
+import math
+import re
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, delete, select
+
+from backend.core.database import engine
+from backend.core.pagination import paginate
+from backend.features.correction.models import Copy
+from backend.features.exams.models import Exam
+from backend.features.results.models import ExamStat
+
+# Grades are out of GRADE_SCALE, the distribution splits it in HISTOGRAM_BUCKETS equal buckets
+GRADE_SCALE = 20.0
+HISTOGRAM_BUCKETS = 10
+QUESTION_PATTERN = re.compile(r"q\d+")
+# Copies read per query when streaming the detailed report
+CSV_BATCH_SIZE = 500
+
+def grade_bucket(grade: float) -> int:
+    return min(max(int(grade / GRADE_SCALE * HISTOGRAM_BUCKETS), 0), HISTOGRAM_BUCKETS - 1)
+
+def question_annotations(annotations: Optional[dict]) -> Dict:
+    # The per-question results of the grader: "q1": "good", or a numeric score
+    return {
+        key: value for key, value in (annotations or {}).items()
+        if QUESTION_PATTERN.fullmatch(key) and isinstance(value, (str, int, float))
+    }
+
+def copy_contribution(copy: Copy) -> Optional[Dict]:
+    """What a corrected copy adds to the statistics of its exam, None if it is not graded"""
+    if copy.grade is None:
+        return None
+    return {
+        "grade": float(copy.grade),
+        "competencies": {
+            name: float(value) for name, value in (copy.competencies or {}).items()
+            if isinstance(value, (int, float))
+        },
+        "questions": question_annotations(copy.annotations),
+    }
+
+def contribution_deltas(contribution: Optional[Dict], sign: int = 1) -> Dict[str, List[float]]:
+    """ExamStat increments of a copy_contribution, key -> [count, total, total_sq]; sign=-1 removes it"""
+    deltas: Dict[str, List[float]] = {}
+    if contribution is None:
+        return deltas
+
+    def add(key: str, value: float = 0.0) -> None:
+        delta = deltas.setdefault(key, [0, 0.0, 0.0])
+        delta[0] += sign
+        delta[1] += sign * value
+        delta[2] += sign * value * value
+
+    grade = contribution["grade"]
+    add("grade", grade)
+    add(f"bucket:{grade_bucket(grade)}")
+    for name, value in contribution["competencies"].items():
+        add(f"competency:{name}", value)
+    for question, value in contribution["questions"].items():
+        if isinstance(value, str):
+            add(f"verdict:{question}:{value}")
+        else:
+            add(f"question:{question}", value)
+    return deltas
+
+def apply_contributions(session: Session, exam_id: str, old_contribution: Optional[Dict],
+                        new_contribution: Optional[Dict]) -> None:
+    """Replace the contribution of a (re-)corrected copy in the statistics of its exam
+
+    Runs in the caller's transaction, commit it with the correction. Each
+    statistic is incremented in the database, so concurrent corrections of the
+    same exam do not overwrite each other's updates.
+    """
+    deltas = contribution_deltas(old_contribution, sign=-1)
+    for key, (count, total, total_sq) in contribution_deltas(new_contribution).items():
+        delta = deltas.setdefault(key, [0, 0.0, 0.0])
+        delta[0] += count
+        delta[1] += total
+        delta[2] += total_sq
+    # Same contribution as before (e.g. a copy corrected again with the same result)
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    statement = sqlite_insert(ExamStat).values([
+        {"exam_id": exam_id, "key": key, "count": count, "total": total, "total_sq": total_sq}
+        for key, (count, total, total_sq) in deltas.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[ExamStat.exam_id, ExamStat.key],
+        set_={
+            "count": ExamStat.count + statement.excluded.count,
+            "total": ExamStat.total + statement.excluded.total,
+            "total_sq": ExamStat.total_sq + statement.excluded.total_sq,
+        },
+    )
+    session.exec(statement)
+
+def rebuild_exam_stats(session: Session, exam_id: str) -> None:
+    """Recompute the statistics of an exam from its copies, e.g. for copies graded before they existed"""
+    session.exec(delete(ExamStat).where(ExamStat.exam_id == exam_id))
+    statement = select(Copy).where(Copy.exam_id == exam_id, Copy.grade.is_not(None))
+    for copy in session.exec(statement):
+        apply_contributions(session, exam_id, None, copy_contribution(copy))
+    session.commit()
+
+def backfill_exam_stats(session: Session) -> None:
+    # Exams with graded copies but no statistics yet, once at startup (not the deleted ones)
+    graded_exams = select(Copy.exam_id).join(Exam, Exam.id == Copy.exam_id).where(Copy.grade.is_not(None)).distinct()
+    exams_with_stats = select(ExamStat.exam_id).where(ExamStat.key == "grade")
+    for exam_id in session.exec(graded_exams.where(Copy.exam_id.not_in(exams_with_stats))).all():
+        rebuild_exam_stats(session, exam_id)
+
+def get_exam_stats(session: Session, exam_id: str) -> Dict[str, ExamStat]:
+    statement = select(ExamStat).where(ExamStat.exam_id == exam_id)
+    return {stat.key: stat for stat in session.exec(statement)}
+
+def graded_grades(exam_id: str, descending: bool = False):
+    # Served by the (exam_id, grade) index of copy
+    return (
+        select(Copy.grade)
+        .where(Copy.exam_id == exam_id, Copy.grade.is_not(None))
+        .order_by(Copy.grade.desc() if descending else Copy.grade)
+    )
+
+def get_median(session: Session, exam_id: str, count: int) -> Optional[float]:
+    if not count:
+        return None
+    grades = session.exec(graded_grades(exam_id).offset((count - 1) // 2).limit(2 - count % 2)).all()
+    return sum(grades) / len(grades) if grades else None
+
+def get_exam_report(session: Session, exam_id: str) -> Dict:
+    """Statistics of the graded copies of an exam, read from its ExamStat rows"""
+    stats = get_exam_stats(session, exam_id)
+    grade = stats.get("grade")
+    count = grade.count if grade else 0
+    mean = stddev = None
+    if count:
+        mean = grade.total / count
+        # Population standard deviation, clamped against rounding below zero
+        stddev = math.sqrt(max(grade.total_sq / count - mean * mean, 0.0))
+
+    questions: Dict[str, Dict] = {}
+    competencies: Dict[str, Dict] = {}
+    for key, stat in sorted(stats.items()):
+        if not stat.count:
+            continue
+        kind, _, name = key.partition(":")
+        if kind == "question":
+            question = questions.setdefault(name, {"scored": 0, "mean": None, "verdicts": {}})
+            question["scored"] = stat.count
+            question["mean"] = stat.total / stat.count
+        elif kind == "verdict":
+            question_name, _, verdict = name.partition(":")
+            question = questions.setdefault(question_name, {"scored": 0, "mean": None, "verdicts": {}})
+            question["verdicts"][verdict] = stat.count
+        elif kind == "competency":
+            competencies[name] = {"count": stat.count, "mean": stat.total / stat.count}
+
+    bucket_width = GRADE_SCALE / HISTOGRAM_BUCKETS
+    return {
+        "graded_copies": count,
+        "mean": mean,
+        "median": get_median(session, exam_id, count),
+        "stddev": stddev,
+        "min": session.exec(graded_grades(exam_id).limit(1)).first() if count else None,
+        "max": session.exec(graded_grades(exam_id, descending=True).limit(1)).first() if count else None,
+        "distribution": [
+            {
+                "from": index * bucket_width,
+                "to": (index + 1) * bucket_width,
+                "count": stats[f"bucket:{index}"].count if f"bucket:{index}" in stats else 0,
+            }
+            for index in range(HISTOGRAM_BUCKETS)
+        ],
+        "questions": questions,
+        "competencies": competencies,
+    }
+
+def iter_report_csv(exam_id: str) -> Iterator[str]:
+    """Detailed report, one CSV row per copy, read in batches so memory does not grow with the exam"""
+    # Own session: the response is streamed after the request's session is closed
+    with Session(engine) as session:
+        yield from _iter_report_csv(session, exam_id)
+
+def _iter_report_csv(session: Session, exam_id: str) -> Iterator[str]:
+    # Columns of the competencies and questions seen in the exam
+    competencies, questions = set(), set()
+    for key in get_exam_stats(session, exam_id):
+        kind, _, name = key.partition(":")
+        if kind == "competency":
+            competencies.add(name)
+        elif kind == "question":
+            questions.add(name)
+        elif kind == "verdict":
+            questions.add(name.partition(":")[0])
+    competencies, questions = sorted(competencies), sorted(questions)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(["copy_id", "file_path", "grade"] + competencies + questions)
+    yield flush()
+
+    statement = select(Copy).where(Copy.exam_id == exam_id)
+    after = None
+    while True:
+        copies, after = paginate(session, statement, Copy, CSV_BATCH_SIZE, after)
+        for copy in copies:
+            copy_competencies = copy.competencies or {}
+            copy_questions = question_annotations(copy.annotations)
+            writer.writerow(
+                [copy.id, copy.file_path, "" if copy.grade is None else copy.grade]
+                + [copy_competencies.get(name, "") for name in competencies]
+                + [copy_questions.get(question, "") for question in questions]
+            )
+        yield flush()
+        if after is None:
+            return
@@ -1,5 +1,7 @@
-from fastapi import FastAPI
+import threading
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 from sqlmodel import Session
 
 from backend.core.config import settings
@@ -9,7 +11,9 @@ from backend.features.auth.models import UserCreate, UserRole
 from backend.features.auth.router import router as auth_router
 from backend.features.exams.router import router as exams_router
 from backend.features.correction.router import router as correction_router
+from backend.features.correction.inference import inference_status, preload_inference
 from backend.features.results.router import router as results_router
+from backend.features.results import service as results_service
 from backend.features.chatbot.router import router as chatbot_router
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -26,6 +30,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the frontend on paginated lists
+    expose_headers=["ETag", "X-Next-Cursor"],
     allow_origin_regex=r"https://.*\.app\.github\.dev",
 )
 
@@ -34,6 +40,12 @@ app.add_middleware(
 def on_startup():
     create_db_and_tables()
     seed_default_users()
+    with Session(engine) as session:
+        # Statistics of the exams graded before they were maintained
+        results_service.backfill_exam_stats(session)
+        auth_service.purge_revoked_tokens(session)
+    if settings.INFERENCE_PRELOAD:
+        threading.Thread(target=preload_inference, name="inference-preload", daemon=True).start()
 
 
 def seed_default_users():
@@ -78,3 +90,19 @@ app.include_router(chatbot_router, prefix=f"{settings.API_V1_STR}", tags=["chatb
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Exam Correction System API"}
+
+@app.get("/health")
+def health(response: Response):
+    # Readiness of the API; the inference stack is reported apart, it loads on the first correction
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        database = "ok"
+    except Exception as e:
+        database = f"error: {e}"
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ok" if database == "ok" else "unavailable",
+        "database": database,
+        "inference": inference_status(),
+    }
@@ -0,0 +1,152 @@
+"""
+Benchmark of `MarkdownConverter` on a long synthetic document.
+
+Generates the recognition results of a document (headings, paragraphs with
+inline LaTeX and line breaks, formulas, HTML tables, lists, code, figures,
+some Chinese text) from a fixed seed, and times `convert`.
+
+With `--baseline REV`, the converter of that git revision is timed on the same
+results too, and the outputs are checked to be identical:
+
+    python benchmarks/benchmark_markdown.py --num_pages 100 --baseline HEAD~1
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# utils is imported as a top level module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.markdown_utils import MarkdownConverter  # noqa: E402
+
+WORDS = (
+    "the student answer question derivative integral function limit therefore hence proof assume value "
+    "equation solution matrix vector probability theorem lemma continuous bounded"
+).split()
+CHINESE_WORDS = ["函数", "导数", "积分", "证明", "因此", "答案", "问题", "矩阵"]
+LATEX = [
+    r"\frac{a}{b}", r"\bm{x}", r"\quad", r"\eqno(1)", r"\leq", r"\pm", r"\varmathbb{R}", r"\in fty",
+    r"\mu", r"\upmu", r"\cdot", r"\langle u, v \rangle", r"\sum_{i=1}^{n} x_i", r"\int_0^1 f(x) dx",
+    r"\alpha", r"\beta", r"x^2",
+]
+
+
+def random_sentence(rng, chinese=False):
+    words = rng.choices(CHINESE_WORDS if chinese else WORDS, k=rng.randint(6, 18))
+    if not chinese and rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), f"${' '.join(rng.choices(LATEX, k=rng.randint(1, 4)))}$")
+    return ("" if chinese else " ").join(words)
+
+
+def random_paragraph(rng):
+    chinese = rng.random() < 0.15
+    lines = []
+    for _ in range(rng.randint(2, 8)):
+        line = random_sentence(rng, chinese)
+        if rng.random() < 0.1:
+            line += "-"
+        lines.append(line)
+        if rng.random() < 0.1:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def random_table(rng):
+    rows = "".join(
+        "<tr>" + "".join(f"<td>{rng.choice(WORDS)} {rng.randint(0, 99)}</td>" for _ in range(4)) + "</tr>"
+        for _ in range(rng.randint(2, 8))
+    )
+    return f'<table border="1">{rows}</table>'
+
+
+def generate_results(num_pages, elements_per_page, seed=0):
+    """Recognition results of a document, pages joined as `save_combined_pdf_results` does"""
+    rng = random.Random(seed)
+    results = []
+    for page in range(num_pages):
+        if results:
+            results.append({"label": "page_separator", "text": "\n\n---\n\n", "reading_order": len(results)})
+        for reading_order in range(elements_per_page):
+            label = rng.choices(
+                ["sec_0", "sec_1", "sec_2", "para", "equ", "tab", "list", "code", "fig"],
+                weights=[1, 3, 3, 40, 12, 3, 8, 1, 2],
+            )[0]
+            if label.startswith("sec_"):
+                text = random_sentence(rng, rng.random() < 0.15)
+                if rng.random() < 0.2:
+                    text += "\n" + random_sentence(rng)
+            elif label == "equ":
+                text = f"$${' '.join(rng.choices(LATEX, k=rng.randint(3, 12)))}$$"
+            elif label == "tab":
+                text = random_table(rng)
+            elif label == "fig":
+                text = f"![Figure](figures/page_{page + 1:03d}_figure_{reading_order:03d}.png)"
+            elif label == "code":
+                text = "\n".join(f"x_{i} = f({i})" for i in range(rng.randint(1, 5)))
+            elif label == "list":
+                text = random_sentence(rng)
+            else:
+                text = random_paragraph(rng)
+            results.append({"label": label, "text": text, "reading_order": reading_order})
+    return results
+
+
+def load_baseline(revision):
+    """MarkdownConverter of the given git revision"""
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source = subprocess.run(
+        ["git", "show", f"{revision}:./utils/markdown_utils.py"],
+        cwd=repo_dir, check=True, capture_output=True, text=True,
+    ).stdout
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location("baseline_markdown_utils", f.name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    os.unlink(f.name)
+    return module.MarkdownConverter
+
+
+def time_convert(converter_class, results, repeat):
+    """Best wall time of `repeat` runs, including the converter construction like `save_outputs`"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = converter_class().convert(results)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Markdown conversion")
+    parser.add_argument("--num_pages", type=int, default=100, help="Pages of the document (default: 100)")
+    parser.add_argument("--elements_per_page", type=int, default=40, help="Elements per page (default: 40)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs, the best one is reported (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=None, help="Git revision of a converter to compare with")
+    args = parser.parse_args()
+
+    results = generate_results(args.num_pages, args.elements_per_page, args.seed)
+    print(f"{len(results)} elements, {sum(len(result['text']) for result in results) / 1e6:.2f} M characters")
+
+    seconds, output = time_convert(MarkdownConverter, results, args.repeat)
+    print(f"current:  {seconds * 1000:8.1f} ms ({len(results) / seconds:,.0f} elements/s)")
+
+    if args.baseline:
+        baseline_seconds, baseline_output = time_convert(load_baseline(args.baseline), results, args.repeat)
+        print(f"baseline: {baseline_seconds * 1000:8.1f} ms ({len(results) / baseline_seconds:,.0f} elements/s)")
+        print(f"speedup:  {baseline_seconds / seconds:.2f}x")
+        if output != baseline_output:
+            print("ERROR: the outputs differ")
+            sys.exit(1)
+        print("outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
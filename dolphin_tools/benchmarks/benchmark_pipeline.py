@@ -0,0 +1,240 @@
+"""
+End-to-end benchmark of the page parsing pipeline (`demo_page.process_document`).
+
+Runs the pipeline over a synthetic exam corpus generated from a fixed seed, and
+reports the time spent in each stage, pages/sec and peak RSS.
+
+Examples:
+    # CPU only, tiny random model, ground-truth layouts
+    python benchmarks/benchmark_pipeline.py --tiny --num_pages 20
+
+    # The real model
+    python benchmarks/benchmark_pipeline.py --model_path ./hf_model --num_pages 50 --output_json results.json
+
+Stage times are exclusive: a stage does not count the stages it calls (e.g.
+"crop" is `process_elements` without the element generation).
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# demo_page and utils are imported as top level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import demo_page  # noqa: E402
+from synthetic_exam import generate_corpus  # noqa: E402
+from utils.markdown_utils import MarkdownConverter  # noqa: E402
+from utils.utils import setup_output_dirs  # noqa: E402
+
+LAYOUT_PROMPT = "Parse the reading order of this document."
+STAGES = [
+    "rasterize",
+    "prepare_image",
+    "layout_generate",
+    "crop",
+    "element_generate",
+    "save_outputs",
+    "markdown",
+]
+
+
+class StageTimer:
+    """Accumulates exclusive wall time per stage"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._children = []
+
+    @contextmanager
+    def stage(self, name):
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed - self._children.pop()
+            self.calls[name] += 1
+            if self._children:
+                self._children[-1] += elapsed
+
+    def wrap(self, name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+
+class TimedModel:
+    """Wraps a DOLPHIN model to time layout and element generation
+
+    With `layouts`, the layout stage still runs the model but returns the next
+    ground-truth layout, so a random model produces a realistic set of elements.
+    """
+
+    def __init__(self, model, timer, layouts=None):
+        self.model = model
+        self.timer = timer
+        self.layouts = layouts
+        self.layout_index = 0
+
+    def chat(self, prompt, image):
+        is_layout = not isinstance(image, list) and prompt == LAYOUT_PROMPT
+        with self.timer.stage("layout_generate" if is_layout else "element_generate"):
+            output = self.model.chat(prompt, image)
+        if is_layout and self.layouts is not None:
+            output = self.layouts[self.layout_index % len(self.layouts)]
+            self.layout_index += 1
+        return output
+
+
+def install_stage_timers(timer):
+    """Time the pipeline functions by wrapping them where demo_page looks them up"""
+    demo_page.convert_pdf_to_images = timer.wrap("rasterize", demo_page.convert_pdf_to_images)
+    demo_page.prepare_image = timer.wrap("prepare_image", demo_page.prepare_image)
+    demo_page.process_elements = timer.wrap("crop", demo_page.process_elements)
+    demo_page.save_outputs = timer.wrap("save_outputs", demo_page.save_outputs)
+    demo_page.save_combined_pdf_results = timer.wrap("save_outputs", demo_page.save_combined_pdf_results)
+    # PDF pages are appended to the combined outputs one at a time
+    demo_page.PdfResultStream._write_page = timer.wrap("save_outputs", demo_page.PdfResultStream._write_page)
+    demo_page.save_compact = timer.wrap("save_outputs", demo_page.save_compact)
+    MarkdownConverter.convert = timer.wrap("markdown", MarkdownConverter.convert)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def run_corpus(document_paths, model, save_dir, max_batch_size, output_format):
+    for document_path in document_paths:
+        demo_page.process_document(document_path, model, save_dir, max_batch_size, output_format=output_format)
+
+
+def format_report(report):
+    lines = [
+        f"Documents: {report['documents']}, pages: {report['pages']}",
+        f"Wall time: {report['wall_time_s']:.2f} s, {report['pages_per_sec']:.2f} pages/sec",
+        f"Peak RSS: {report['peak_rss_mb']:.0f} MB",
+        "",
+        f"{'stage':<18}{'total (s)':>12}{'calls':>8}{'ms/page':>10}{'share':>8}",
+    ]
+    for name, stage in report["stages"].items():
+        lines.append(
+            f"{name:<18}{stage['total_s']:>12.3f}{stage['calls']:>8}{stage['ms_per_page']:>10.1f}"
+            f"{stage['share'] * 100:>7.1f}%"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DOLPHIN page parsing pipeline")
+    parser.add_argument("--model_path", default=None, help="Path to Hugging Face model")
+    parser.add_argument("--tiny", action="store_true", help="Use a tiny randomly initialized model (CPU friendly)")
+    parser.add_argument("--num_pages", type=int, default=20, help="Number of synthetic pages (default: 20)")
+    parser.add_argument("--pages_per_document", type=int, default=2, help="Pages per PDF (default: 2)")
+    parser.add_argument("--format", choices=["pdf", "png"], default="pdf", help="Document format (default: pdf)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus and of the tiny model")
+    parser.add_argument("--max_batch_size", type=int, default=16, help="Maximum element batch size (default: 16)")
+    parser.add_argument(
+        "--output_format", choices=demo_page.OUTPUT_FORMATS, default="json", help="Output format (default: json)"
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="Documents to run before timing (default: 1)")
+    parser.add_argument("--tiny_max_new_tokens", type=int, default=32, help="Generation budget of the tiny model")
+    parser.add_argument(
+        "--gt_layout",
+        action="store_true",
+        help="Use the ground-truth layouts instead of the model's (always on with --tiny)",
+    )
+    parser.add_argument("--work_dir", default=None, help="Directory for the corpus and outputs (default: temporary)")
+    parser.add_argument("--output_json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if not args.tiny and not args.model_path:
+        parser.error("either --model_path or --tiny is required")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        corpus_dir = os.path.join(work_dir, "corpus")
+        save_dir = os.path.join(work_dir, "output")
+        setup_output_dirs(save_dir)
+
+        document_paths, layouts = generate_corpus(
+            corpus_dir, args.num_pages, args.pages_per_document, args.format, args.seed
+        )
+
+        model_path = args.model_path
+        if args.tiny:
+            from tiny_model import build_tiny_model
+
+            model_path = build_tiny_model(
+                os.path.join(work_dir, "tiny_model"), seed=args.seed, max_new_tokens=args.tiny_max_new_tokens
+            )
+        print(f"Loading model from {model_path}")
+        timer = StageTimer()
+        model = TimedModel(demo_page.DOLPHIN(model_path), timer, layouts if args.tiny or args.gt_layout else None)
+        install_stage_timers(timer)
+
+        if args.warmup > 0:
+            print(f"Warming up on {args.warmup} document(s)")
+            run_corpus(document_paths[: args.warmup], model, save_dir, args.max_batch_size, args.output_format)
+        timer.reset()
+        model.layout_index = 0
+
+        print(f"Benchmarking {len(document_paths)} document(s), {args.num_pages} page(s)")
+        start = time.perf_counter()
+        run_corpus(document_paths, model, save_dir, args.max_batch_size, args.output_format)
+        wall_time = time.perf_counter() - start
+
+    pages = timer.calls["layout_generate"]
+    stages = {}
+    for name in STAGES + sorted(set(timer.totals) - set(STAGES)):
+        stages[name] = {
+            "total_s": timer.totals[name],
+            "calls": timer.calls[name],
+            "ms_per_page": timer.totals[name] / max(pages, 1) * 1000,
+            "share": timer.totals[name] / wall_time if wall_time else 0.0,
+        }
+    other = wall_time - sum(timer.totals.values())
+    stages["other"] = {
+        "total_s": other,
+        "calls": 0,
+        "ms_per_page": other / max(pages, 1) * 1000,
+        "share": other / wall_time if wall_time else 0.0,
+    }
+
+    report = {
+        "documents": len(document_paths),
+        "pages": pages,
+        "wall_time_s": wall_time,
+        "pages_per_sec": pages / wall_time if wall_time else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "config": vars(args),
+    }
+    print()
+    print(format_report(report))
+
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Synthetic exam pages for benchmarking the document parsing pipeline.
+
+Pages are drawn with PIL from a seeded random generator, so the same seed
+always gives the same corpus. Each page comes with its ground-truth layout in
+the Dolphin layout string format, in the normalized (896) coordinates of the
+padded square image that `prepare_image` produces.
+"""
+
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+# A4 at 150 dpi
+PAGE_WIDTH = 1240
+PAGE_HEIGHT = 1754
+MARGIN = 90
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from or an which function derivative integral "
+    "matrix vector prove show compute explain why value point limit series converge answer question student "
+    "energy force mass velocity reaction solution equation graph table figure result method"
+).split()
+
+FORMULAS = [
+    "f(x) = 3x^2 - 4x + 1",
+    "\\int_0^1 x^2 dx = 1/3",
+    "\\sum_{n=1}^{N} n = N(N+1)/2",
+    "E = m c^2",
+    "\\lim_{x \\to 0} \\sin(x)/x = 1",
+    "a^2 + b^2 = c^2",
+]
+
+
+def load_font(size):
+    for name in ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+class ExamPageGenerator:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.title_font = load_font(40)
+        self.heading_font = load_font(30)
+        self.text_font = load_font(22)
+
+    def sentence(self, num_words):
+        words = [self.rng.choice(WORDS) for _ in range(num_words)]
+        return " ".join(words).capitalize() + "."
+
+    def generate(self, page_number):
+        """Draw one exam page
+
+        Returns:
+            tuple: (PIL Image, list of (bbox, label) in page pixel coordinates)
+        """
+        image = Image.new("RGB", (PAGE_WIDTH, PAGE_HEIGHT), "white")
+        draw = ImageDraw.Draw(image)
+        elements = []
+        y = MARGIN
+
+        def add_text(text, font, label, line_height, x=MARGIN):
+            nonlocal y
+            lines = self.wrap(draw, text, font, PAGE_WIDTH - MARGIN - x)
+            top = y
+            for line in lines:
+                draw.text((x, y), line, fill="black", font=font)
+                y += line_height
+            elements.append(([x, top, PAGE_WIDTH - MARGIN, y], label))
+            y += line_height // 2
+
+        if page_number == 0:
+            add_text(f"Final Exam - Session {self.rng.randint(1, 4)}", self.title_font, "sec_0", 52)
+            add_text("Name: ____________________   Student ID: ____________", self.text_font, "para", 30)
+
+        question = self.rng.randint(1, 9)
+        while True:
+            # Reserve room for the largest block, so elements never run off the page
+            if y > PAGE_HEIGHT - MARGIN - 320:
+                break
+            add_text(f"Question {question} ({self.rng.randint(2, 6)} points)", self.heading_font, "sec_1", 40)
+            add_text(self.sentence(self.rng.randint(18, 45)), self.text_font, "para", 30)
+
+            kind = self.rng.choice(["equ", "tab", "fig", "list", "para"])
+            if kind == "equ":
+                add_text(self.rng.choice(FORMULAS), self.heading_font, "equ", 44, x=MARGIN + 200)
+            elif kind == "tab":
+                self.draw_table(draw, y, elements)
+                y = elements[-1][0][3] + 20
+            elif kind == "fig":
+                self.draw_figure(draw, y, elements)
+                y = elements[-1][0][3] + 20
+            elif kind == "list":
+                for item in "abc"[:self.rng.randint(2, 3)]:
+                    add_text(f"({item}) {self.sentence(self.rng.randint(6, 14))}", self.text_font, "list", 30,
+                             x=MARGIN + 30)
+            else:
+                add_text(self.sentence(self.rng.randint(10, 30)), self.text_font, "para", 30)
+            question += 1
+
+        return image, elements
+
+    def wrap(self, draw, text, font, max_width):
+        lines = []
+        line = ""
+        for word in text.split():
+            candidate = f"{line} {word}".strip()
+            if line and draw.textlength(candidate, font=font) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        if line:
+            lines.append(line)
+        return lines
+
+    def draw_table(self, draw, top, elements):
+        rows, cols = self.rng.randint(3, 5), self.rng.randint(3, 5)
+        cell_w, cell_h = 150, 40
+        left = MARGIN + 100
+        for r in range(rows):
+            for c in range(cols):
+                x, y = left + c * cell_w, top + r * cell_h
+                draw.rectangle([x, y, x + cell_w, y + cell_h], outline="black", width=2)
+                value = f"x{c}" if r == 0 else str(self.rng.randint(0, 99))
+                draw.text((x + 12, y + 8), value, fill="black", font=self.text_font)
+        elements.append(([left, top, left + cols * cell_w, top + rows * cell_h], "tab"))
+
+    def draw_figure(self, draw, top, elements):
+        left, width, height = MARGIN + 150, 420, 260
+        draw.rectangle([left, top, left + width, top + height], outline="black", width=3)
+        for _ in range(self.rng.randint(2, 5)):
+            x, y = left + self.rng.randint(20, width - 80), top + self.rng.randint(20, height - 80)
+            size = self.rng.randint(20, 60)
+            draw.ellipse([x, y, x + size, y + size], outline="blue", width=3)
+        draw.line([left + 10, top + height - 10, left + width - 10, top + 10], fill="red", width=3)
+        elements.append(([left, top, left + width, top + height], "fig"))
+
+
+def to_layout_string(elements, width, height):
+    """Format elements as a Dolphin layout string, in padded 896 coordinates"""
+    size = max(width, height)
+    left = (size - width) // 2
+    top = (size - height) // 2
+    pairs = []
+    for (x1, y1, x2, y2), label in elements:
+        coords = [(x1 + left) / size * 896, (y1 + top) / size * 896, (x2 + left) / size * 896, (y2 + top) / size * 896]
+        pairs.append("[{:.2f},{:.2f},{:.2f},{:.2f}][{}]".format(*coords, label))
+    return "[PAIR_SEP]".join(pairs)
+
+
+def generate_corpus(output_dir, num_pages=20, pages_per_document=2, document_format="pdf", seed=0):
+    """Write a corpus of synthetic exam documents
+
+    Args:
+        output_dir: Directory for the documents and `layouts.json`
+        num_pages: Total number of pages
+        pages_per_document: Pages per PDF (ignored for png, one page per file)
+        document_format: "pdf" or "png"
+        seed: Random seed, the same seed gives the same corpus
+
+    Returns:
+        tuple: (sorted list of document paths, list of ground-truth layout strings in processing order)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generator = ExamPageGenerator(seed)
+    if document_format == "png":
+        pages_per_document = 1
+
+    document_paths = []
+    layouts = []
+    page_index = 0
+    document_index = 0
+    while page_index < num_pages:
+        pages = []
+        for page_number in range(min(pages_per_document, num_pages - page_index)):
+            image, elements = generator.generate(page_number)
+            pages.append(image)
+            layouts.append(to_layout_string(elements, image.width, image.height))
+            page_index += 1
+
+        path = os.path.join(output_dir, f"exam_{document_index:04d}.{document_format}")
+        if document_format == "pdf":
+            pages[0].save(path, "PDF", resolution=150.0, save_all=True, append_images=pages[1:])
+        else:
+            pages[0].save(path, "PNG")
+        document_paths.append(path)
+        document_index += 1
+
+    with open(os.path.join(output_dir, "layouts.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "documents": [os.path.basename(p) for p in document_paths], "layouts": layouts},
+                  f, indent=2)
+
+    return document_paths, layouts
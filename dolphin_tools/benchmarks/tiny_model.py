@@ -0,0 +1,102 @@
+"""
+Tiny randomly initialized Dolphin-shaped model for CPU benchmarks.
+
+Same architecture family as Dolphin (Donut Swin encoder + MBart decoder, Donut
+processor, `<Answer/>` prompt token), scaled down so the full pipeline runs in
+seconds on a CPU. The weights are random, so the outputs are meaningless: it
+measures the cost of the pipeline around the model, not recognition quality.
+"""
+
+import string
+
+import torch
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+from transformers import (
+    DonutImageProcessor,
+    DonutProcessor,
+    DonutSwinConfig,
+    MBartConfig,
+    PreTrainedTokenizerFast,
+    VisionEncoderDecoderConfig,
+    VisionEncoderDecoderModel,
+)
+
+SPECIAL_TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "<Answer/>"]
+
+
+def build_tokenizer():
+    """Character level tokenizer with Dolphin's special tokens, built in memory"""
+    characters = ["▁"] + [c for c in string.printable if not c.isspace()]
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + characters)}
+
+    # BPE without merges: every word is split into single characters
+    tokenizer = Tokenizer(models.BPE(vocab=vocab, merges=[], unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.decoder = decoders.Metaspace()
+
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<s>",
+        eos_token="</s>",
+        pad_token="<pad>",
+        unk_token="<unk>",
+        additional_special_tokens=["<Answer/>"],
+    )
+
+
+def build_tiny_model(save_dir, seed=0, image_size=896, max_new_tokens=32):
+    """Build a tiny random model and save it in a format `DOLPHIN` loads
+
+    Args:
+        save_dir: Directory to save the model and processor to
+        seed: Seed of the random weights
+        image_size: Input resolution of the encoder (Dolphin uses 896)
+        max_new_tokens: Generation budget saved in the generation config. It
+            takes precedence over the max_length passed by `DOLPHIN.chat`,
+            since random weights rarely emit `</s>` on their own.
+
+    Returns:
+        str: save_dir
+    """
+    torch.manual_seed(seed)
+    tokenizer = build_tokenizer()
+
+    encoder_config = DonutSwinConfig(
+        image_size=[image_size, image_size],
+        patch_size=4,
+        embed_dim=32,
+        depths=[1, 1, 1, 1],
+        num_heads=[1, 2, 4, 8],
+        window_size=7,
+    )
+    decoder_config = MBartConfig(
+        vocab_size=len(tokenizer),
+        d_model=64,
+        decoder_layers=1,
+        decoder_attention_heads=2,
+        decoder_ffn_dim=128,
+        max_position_embeddings=max_new_tokens + 64,
+        scale_embedding=True,
+        is_decoder=True,
+        add_cross_attention=True,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    config = VisionEncoderDecoderConfig.from_encoder_decoder_configs(encoder_config, decoder_config)
+    config.pad_token_id = tokenizer.pad_token_id
+    config.decoder_start_token_id = tokenizer.bos_token_id
+    config.eos_token_id = tokenizer.eos_token_id
+
+    model = VisionEncoderDecoderModel(config=config)
+    model.generation_config.max_new_tokens = max_new_tokens
+    model.generation_config.pad_token_id = tokenizer.pad_token_id
+    model.generation_config.eos_token_id = tokenizer.eos_token_id
+    model.generation_config.decoder_start_token_id = tokenizer.bos_token_id
+
+    image_processor = DonutImageProcessor(size={"height": image_size, "width": image_size})
+    processor = DonutProcessor(image_processor=image_processor, tokenizer=tokenizer)
+
+    model.save_pretrained(save_dir)
+    processor.save_pretrained(save_dir)
+    return save_dir
@@ -5,14 +5,23 @@ SPDX-License-Identifier: MIT
 
 import argparse
 import glob
+import multiprocessing
+import multiprocessing.connection
 import os
+import sys
+import time
+from contextlib import redirect_stdout
 
 import cv2
 import torch
 from PIL import Image
 from transformers import AutoProcessor, VisionEncoderDecoderModel
 
+from utils.compact import get_compact_path, save_compact
+from utils.manifest import Manifest, PageCache, file_fingerprint, image_sha256
+from utils.tracing import NOOP_TRACER, RecordingTracer
 from utils.utils import *
+from utils.writer import SYNC_WRITER, AsyncOutputWriter
 
 
 class DOLPHIN:
@@ -111,51 +120,145 @@ class DOLPHIN:
         return results
 
 
-def process_document(document_path, model, save_dir, max_batch_size=None):
-    """Parse documents with two stages - Handles both images and PDFs"""
+OUTPUT_FORMATS = ["json", "compact", "both"]
+
+
+def process_document(document_path, model, save_dir, max_batch_size=None, tracer=None, page_cache=None, writer=None,
+                     output_format="json"):
+    """Parse documents with two stages - Handles both images and PDFs
+
+    Args:
+        tracer: Optional utils.tracing.Tracer receiving a span per pipeline stage
+        page_cache: Optional utils.manifest.PageCache, PDF pages found in it are not parsed again
+        writer: Optional utils.writer.OutputWriter running the output writes, flushed before returning
+        output_format: "json" (JSON + Markdown), "compact" (utils.compact .npz only) or "both"
+
+    Returns:
+        Tuple of (path of the JSON, or of the compact file with "compact", recognition_results)
+    """
+    tracer = tracer or NOOP_TRACER
+    writer = writer or SYNC_WRITER
+    with tracer.span("document", path=document_path):
+        try:
+            json_future, recognition_results = _process_document(
+                document_path, model, save_dir, max_batch_size, tracer, page_cache, writer, output_format
+            )
+        except BaseException:
+            # The writes of the failed document must not fail the next one's flush
+            writer.discard()
+            raise
+        # Document end: wait for the figures and outputs still being written
+        with tracer.span("flush_outputs"):
+            writer.flush()
+        return json_future.result(), recognition_results
+
+
+def _process_document(document_path, model, save_dir, max_batch_size, tracer, page_cache, writer, output_format):
+    """Returns (Future of the JSON path, results), the outputs may still be being written"""
     file_ext = os.path.splitext(document_path)[1].lower()
     
     if file_ext == '.pdf':
         # Convert PDF to images
-        images = convert_pdf_to_images(document_path)
+        with tracer.span("rasterize") as span:
+            images = convert_pdf_to_images(document_path)
+            span.set_attribute("pages", len(images))
         if not images:
             raise Exception(f"Failed to convert PDF {document_path} to images")
         
         all_results = []
-        
-        # Process each page
-        for page_idx, pil_image in enumerate(images):
-            print(f"Processing page {page_idx + 1}/{len(images)}")
-            
-            # Generate output name for this page
-            base_name = os.path.splitext(os.path.basename(document_path))[0]
-            page_name = f"{base_name}_page_{page_idx + 1:03d}"
-            
-            # Process this page (don't save individual page results)
-            json_path, recognition_results = process_single_image(
-                pil_image, model, save_dir, page_name, max_batch_size, save_individual=False
+        # Combined JSON and Markdown are appended page by page, unless only the compact file is written
+        stream = PdfResultStream(document_path, save_dir, len(images)) if output_format != "compact" else None
+        try:
+            _process_pages(
+                images, document_path, model, save_dir, max_batch_size, tracer, page_cache, writer, stream,
+                all_results,
             )
-            
-            # Add page information to results
-            page_results = {
-                "page_number": page_idx + 1,
-                "elements": recognition_results
-            }
-            all_results.append(page_results)
+        except BaseException:
+            if stream:
+                stream.abort()
+            raise
         
         # Save combined results for multi-page PDF
-        combined_json_path = save_combined_pdf_results(all_results, document_path, save_dir)
+        with tracer.span("write_outputs"):
+            combined_json_future = writer.submit(
+                save_document_results, all_results, document_path, save_dir, True, output_format, stream
+            )
         
-        return combined_json_path, all_results
+        return combined_json_future, all_results
     
     else:
         # Process regular image file
-        pil_image = Image.open(document_path).convert("RGB")
+        with tracer.span("rasterize", pages=1):
+            pil_image = Image.open(document_path).convert("RGB")
         base_name = os.path.splitext(os.path.basename(document_path))[0]
-        return process_single_image(pil_image, model, save_dir, base_name, max_batch_size)
+        _, recognition_results = process_single_image(
+            pil_image, model, save_dir, base_name, max_batch_size, save_individual=False, tracer=tracer, writer=writer
+        )
+        with tracer.span("write_outputs"):
+            json_future = writer.submit(
+                save_document_results, [{"page_number": 1, "elements": recognition_results}], document_path,
+                save_dir, False, output_format,
+            )
+        return json_future, recognition_results
 
 
-def process_single_image(image, model, save_dir, image_name, max_batch_size=None, save_individual=True):
+def _process_pages(images, document_path, model, save_dir, max_batch_size, tracer, page_cache, writer, stream,
+                   all_results):
+    """Parse the pages of a PDF into `all_results`, each page is handed to `stream` as soon as it is parsed"""
+    # Process each page
+    for page_idx, pil_image in enumerate(images):
+        print(f"Processing page {page_idx + 1}/{len(images)}")
+        
+        # Generate output name for this page
+        base_name = os.path.splitext(os.path.basename(document_path))[0]
+        page_name = f"{base_name}_page_{page_idx + 1:03d}"
+        
+        page_hash = image_sha256(pil_image) if page_cache else None
+        recognition_results = page_cache.get(page_hash, page_name) if page_cache else None
+        if recognition_results is not None:
+            print(f"Page {page_idx + 1} unchanged, reusing cached results")
+        else:
+            # Process this page (don't save individual page results)
+            with tracer.span("page", page_number=page_idx + 1):
+                json_path, recognition_results = process_single_image(
+                    pil_image, model, save_dir, page_name, max_batch_size, save_individual=False, tracer=tracer,
+                    writer=writer,
+                )
+            if page_cache:
+                writer.submit(page_cache.put, page_hash, page_name, recognition_results)
+        
+        # Add page information to results
+        page_results = {
+            "page_number": page_idx + 1,
+            "elements": recognition_results
+        }
+        all_results.append(page_results)
+        if stream:
+            # Appended to the combined JSON and Markdown while the next page is parsed
+            stream.add_page(page_results)
+            writer.submit(stream.write_pending)
+
+
+def save_document_results(pages, document_path, save_dir, is_pdf, output_format, stream=None):
+    """Write the results of a document in the requested format, returns the path of the main output
+
+    With a utils.utils.PdfResultStream the pages were already streamed to the
+    combined JSON and Markdown, which are only finished here.
+    """
+    if output_format in ("compact", "both"):
+        compact_path = save_compact(get_compact_path(save_dir, document_path), pages, document_path, is_pdf)
+        if output_format == "compact":
+            return compact_path
+    if stream:
+        return stream.close()
+    if is_pdf:
+        return save_combined_pdf_results(pages, document_path, save_dir)
+    # Only the basename of the document path is used
+    return save_outputs(pages[0]["elements"], document_path, save_dir)
+
+
+def process_single_image(image, model, save_dir, image_name, max_batch_size=None, save_individual=True, tracer=None,
+                         writer=None):
     """Process a single image (either from file or converted from PDF page)
     
     Args:
@@ -165,29 +268,67 @@ def process_single_image(image, model, save_dir, image_name, max_batch_size=None
         image_name: Name for the output file
         max_batch_size: Maximum batch size for processing
         save_individual: Whether to save individual results (False for PDF pages)
+        tracer: Optional utils.tracing.Tracer receiving a span per pipeline stage
+        writer: Optional utils.writer.OutputWriter, figures may still be being written when this returns
         
     Returns:
         Tuple of (json_path, recognition_results)
     """
+    tracer = tracer or NOOP_TRACER
+    writer = writer or SYNC_WRITER
+
     # Stage 1: Page-level layout and reading order parsing
-    layout_output = model.chat("Parse the reading order of this document.", image)
+    with tracer.span("layout"):
+        layout_output = model.chat("Parse the reading order of this document.", image)
 
     # Stage 2: Element-level content parsing
-    padded_image, dims = prepare_image(image)
-    recognition_results = process_elements(layout_output, padded_image, dims, model, max_batch_size, save_dir, image_name)
+    with tracer.span("prepare_image"):
+        padded_image, dims = prepare_image(image)
+    recognition_results = process_elements(
+        layout_output, padded_image, dims, model, max_batch_size, save_dir, image_name, tracer=tracer, writer=writer
+    )
 
     # Save outputs only if requested (skip for PDF pages)
     json_path = None
     if save_individual:
         # Create a dummy image path for save_outputs function
         dummy_image_path = f"{image_name}.jpg"  # Extension doesn't matter, only basename is used
-        json_path = save_outputs(recognition_results, dummy_image_path, save_dir)
+        with tracer.span("write_outputs"):
+            json_path = writer.submit(save_outputs, recognition_results, dummy_image_path, save_dir).result()
 
     return json_path, recognition_results
 
 
-def process_elements(layout_results, padded_image, dims, model, max_batch_size, save_dir=None, image_name=None):
+def process_elements(layout_results, padded_image, dims, model, max_batch_size, save_dir=None, image_name=None,
+                     tracer=None, writer=None):
     """Parse all document elements with parallel decoding"""
+    tracer = tracer or NOOP_TRACER
+    writer = writer or SYNC_WRITER
+    with tracer.span("crop") as span:
+        elements = _crop_elements(layout_results, padded_image, dims, save_dir, image_name, writer)
+        span.set_attribute("elements", sum(len(group) for group in elements))
+    figure_results, tab_elements, equ_elements, code_elements, text_elements = elements
+
+    recognition_results = figure_results.copy()
+
+    for elements_type, type_elements, prompt in [
+        ("tab", tab_elements, "Parse the table in the image."),
+        ("equ", equ_elements, "Read formula in the image."),
+        ("code", code_elements, "Read code in the image."),
+        ("text", text_elements, "Read text in the image."),
+    ]:
+        if type_elements:
+            with tracer.span(f"elements.{elements_type}", count=len(type_elements)):
+                results = process_element_batch(type_elements, model, prompt, max_batch_size)
+            recognition_results.extend(results)
+
+    recognition_results.sort(key=lambda x: x.get("reading_order", 0))
+
+    return recognition_results
+
+
+def _crop_elements(layout_results, padded_image, dims, save_dir, image_name, writer):
+    """Crop the layout elements, hand the figures to the writer and group the rest by type"""
     layout_results = parse_layout_string(layout_results)
 
     tab_elements = []      
@@ -210,7 +351,9 @@ def process_elements(layout_results, padded_image, dims, model, max_batch_size,
                 pil_crop = Image.fromarray(cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB))
                 
                 if label == "fig":
-                    figure_filename = save_figure_to_local(pil_crop, save_dir, image_name, reading_order)
+                    # PNG encoding runs on the writer, not in the inference loop
+                    figure_filename = get_figure_filename(image_name, reading_order)
+                    writer.submit(save_figure_to_local, pil_crop, save_dir, image_name, reading_order)
                     figure_results.append({
                         "label": label,
                         "text": f"![Figure](figures/{figure_filename})",
@@ -242,27 +385,7 @@ def process_elements(layout_results, padded_image, dims, model, max_batch_size,
             print(f"Error processing bbox with label {label}: {str(e)}")
             continue
 
-    recognition_results = figure_results.copy()
-    
-    if tab_elements:
-        results = process_element_batch(tab_elements, model, "Parse the table in the image.", max_batch_size)
-        recognition_results.extend(results)
-    
-    if equ_elements:
-        results = process_element_batch(equ_elements, model, "Read formula in the image.", max_batch_size)
-        recognition_results.extend(results)
-    
-    if code_elements:
-        results = process_element_batch(code_elements, model, "Read code in the image.", max_batch_size)
-        recognition_results.extend(results)
-    
-    if text_elements:
-        results = process_element_batch(text_elements, model, "Read text in the image.", max_batch_size)
-        recognition_results.extend(results)
-
-    recognition_results.sort(key=lambda x: x.get("reading_order", 0))
-
-    return recognition_results
+    return figure_results, tab_elements, equ_elements, code_elements, text_elements
 
 
 def process_element_batch(elements, model, prompt, max_batch_size=None):
@@ -298,6 +421,250 @@ def process_element_batch(elements, model, prompt, max_batch_size=None):
     return results
 
 
+def collect_document_files(input_path):
+    """Images and PDFs of a directory, or the single input file"""
+    if os.path.isdir(input_path):
+        # Support both image and PDF files
+        file_extensions = [".jpg", ".jpeg", ".png", ".JPG", ".JPEG", ".PNG", ".pdf", ".PDF"]
+
+        document_files = []
+        for ext in file_extensions:
+            document_files.extend(glob.glob(os.path.join(input_path, f"*{ext}")))
+        return sorted(document_files)
+
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input path {input_path} does not exist")
+
+    # Check if it's a supported file type
+    file_ext = os.path.splitext(input_path)[1].lower()
+    supported_exts = ['.jpg', '.jpeg', '.png', '.pdf']
+
+    if file_ext not in supported_exts:
+        raise ValueError(f"Unsupported file type: {file_ext}. Supported types: {supported_exts}")
+
+    return [input_path]
+
+
+def run_document(file_path, model, save_dir, max_batch_size, trace=False, reuse_pages=True, writer=None,
+                 output_format="json"):
+    """Process one document, returns (status, manifest fields)
+
+    The manifest fields hold the fingerprint of the file as it was processed,
+    and with `reuse_pages` the number of PDF pages served by the page cache.
+    """
+    tracer = RecordingTracer() if trace else None
+    page_cache = PageCache(os.path.join(save_dir, "pages")) if reuse_pages else None
+    start = time.perf_counter()
+    try:
+        fingerprint = file_fingerprint(file_path)
+        json_path, _ = process_document(
+            document_path=file_path,
+            model=model,
+            save_dir=save_dir,
+            max_batch_size=max_batch_size,
+            tracer=tracer,
+            page_cache=page_cache,
+            writer=writer,
+            output_format=output_format,
+        )
+    except Exception as e:
+        return "failed", {"error": str(e), "seconds": round(time.perf_counter() - start, 3)}
+
+    fields = {"json_path": json_path, "seconds": round(time.perf_counter() - start, 3), **fingerprint}
+    if page_cache:
+        fields["pages_reused"] = page_cache.hits
+        fields["pages_parsed"] = page_cache.misses
+    if tracer:
+        fields["timings"] = tracer.timings()
+    return "done", fields
+
+
+def print_timings(timings):
+    print(f"Total: {timings['total']:.3f}s")
+    for name, stage in timings["stages"].items():
+        print(f"  {name}: {stage['seconds']:.3f}s ({stage['count']} spans)")
+
+
+def create_writer(writer_threads):
+    """Background writer with `writer_threads` threads, or a synchronous one for 0"""
+    return AsyncOutputWriter(max_workers=writer_threads) if writer_threads > 0 else SYNC_WRITER
+
+
+def split_cores(num_workers, threads_per_worker=None):
+    """Assign each worker a contiguous group of the CPUs this process may run on
+
+    Without `threads_per_worker` the CPUs are split evenly; groups wrap around
+    when more threads are requested than there are CPUs.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = threads_per_worker or max(1, len(cores) // num_workers)
+    return [
+        [cores[(worker_id * per_worker + i) % len(cores)] for i in range(per_worker)]
+        for worker_id in range(num_workers)
+    ]
+
+
+def _worker(worker_id, cores, cuda_device, model_path, save_dir, max_batch_size, trace, reuse_pages, writer_threads,
+            output_format, tasks, events, log_path):
+    """Worker process: load a model and process files from `tasks` until a None sentinel
+
+    Events are sent on the `events` pipe, which is unbuffered: a worker killed
+    mid-document (e.g. out of memory) cannot lose the events sent before.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    if cuda_device is not None:
+        # Before the model loading initializes CUDA
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(cuda_device)
+
+    # The per page prints of the pipeline go to the worker log, the parent owns the terminal
+    with open(log_path, "a", encoding="utf-8", buffering=1) as log, redirect_stdout(log):
+        try:
+            model = DOLPHIN(model_path)
+        except Exception as e:
+            events.send(("error", None, {"error": f"Failed to load model: {e}"}))
+            return
+
+        with create_writer(writer_threads) as writer:
+            while True:
+                file_path = tasks.get()
+                if file_path is None:
+                    break
+                print(f"\nProcessing {file_path}")
+                events.send(("start", file_path, None))
+                status, fields = run_document(
+                    file_path, model, save_dir, max_batch_size, trace, reuse_pages, writer, output_format
+                )
+                print(f"{status}: {fields}")
+                events.send((status, file_path, fields))
+
+
+class ProgressDisplay:
+    """Single progress line shared by all workers, rewritten in place on a terminal"""
+
+    def __init__(self, total, stream=None):
+        self.total = total
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self.interactive = self.stream.isatty()
+
+    def update(self, status, file_path):
+        if status == "done":
+            self.done += 1
+        else:
+            self.failed += 1
+        finished = self.done + self.failed
+        elapsed = time.perf_counter() - self.start
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - finished) / rate if rate > 0 else 0.0
+        line = (
+            f"[{finished}/{self.total}] done {self.done}, failed {self.failed}, "
+            f"{rate * 60:.1f} files/min, ETA {eta:.0f}s - {status} {os.path.basename(file_path)}"
+        )
+        if self.interactive:
+            self.stream.write(f"\r\033[K{line}")
+        else:
+            self.stream.write(f"{line}\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.interactive:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def run_parallel(document_files, args, save_dir, manifest):
+    """Process the files with `args.workers` processes, each pinned to its own CPUs
+
+    Files are handed out from a shared queue, so a worker stuck on a long PDF
+    does not hold back the others. Only this process writes the manifest.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    tasks = ctx.Queue()
+    for file_path in document_files:
+        tasks.put(file_path)
+    for _ in range(args.workers):
+        tasks.put(None)
+
+    core_groups = split_cores(args.workers, args.threads_per_worker)
+    num_gpus = torch.cuda.device_count() if torch.cuda.is_available() else 0
+    log_dir = os.path.join(save_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    workers = []
+    readers = {}
+    for worker_id, cores in enumerate(core_groups):
+        cuda_device = worker_id % num_gpus if num_gpus else None
+        log_path = os.path.join(log_dir, f"worker_{worker_id}.log")
+        reader, writer = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_worker,
+            args=(worker_id, cores, cuda_device, args.model_path, save_dir, args.max_batch_size, args.trace,
+                  not args.overwrite, args.writer_threads, args.output_format, tasks, writer, log_path),
+            daemon=True,
+        )
+        process.start()
+        # Only the worker holds the write end, so the reader sees EOF when it exits
+        writer.close()
+        workers.append(process)
+        readers[reader] = worker_id
+        device = f", cuda:{cuda_device}" if cuda_device is not None else ""
+        print(f"Worker {worker_id}: cores {cores}{device}, log {log_path}")
+
+    progress = ProgressDisplay(len(document_files))
+    in_progress = {}
+    try:
+        while readers:
+            for reader in multiprocessing.connection.wait(list(readers)):
+                worker_id = readers[reader]
+                try:
+                    event, file_path, fields = reader.recv()
+                except EOFError:
+                    del readers[reader]
+                    workers[worker_id].join()
+                    if worker_id in in_progress:
+                        # Killed in the middle of a document
+                        file_path = in_progress.pop(worker_id)
+                        error = f"worker exited with code {workers[worker_id].exitcode}"
+                        manifest.record(file_path, "failed", worker=worker_id, error=error)
+                        progress.update("failed", file_path)
+                    continue
+
+                if event == "start":
+                    in_progress[worker_id] = file_path
+                elif event == "error":
+                    progress.close()
+                    print(f"Worker {worker_id}: {fields['error']}")
+                else:
+                    in_progress.pop(worker_id, None)
+                    manifest.record(file_path, event, worker=worker_id, **fields)
+                    progress.update(event, file_path)
+    except KeyboardInterrupt:
+        progress.close()
+        print("Interrupted, rerun the same command to resume")
+        for process in workers:
+            process.terminate()
+        raise
+    finally:
+        for process in workers:
+            process.join(timeout=5)
+    progress.close()
+
+    if args.trace:
+        for file_path in document_files:
+            entry = manifest.entries.get(manifest.key(file_path), {})
+            if "timings" in entry:
+                print(f"\n{file_path}")
+                print_timings(entry["timings"])
+    return progress.done, progress.failed
+
+
 def main():
     parser = argparse.ArgumentParser(description="Document parsing based on DOLPHIN")
     parser.add_argument("--model_path", default="./hf_model", help="Path to Hugging Face model")
@@ -314,57 +681,90 @@ def main():
         default=16,
         help="Maximum number of document elements to parse in a single batch (default: 16)",
     )
+    parser.add_argument("--trace", action="store_true", help="Print the time spent in each stage per document")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes, each with its own model and CPU cores (default: 1)",
+    )
+    parser.add_argument(
+        "--threads_per_worker",
+        type=int,
+        default=None,
+        help="CPU cores (and torch threads) per worker (default: available cores / workers)",
+    )
+    parser.add_argument(
+        "--output_format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help="json: JSON + Markdown, compact: columnar .npz in <save_dir>/compact (render later with "
+        "python -m utils.compact), both (default: json)",
+    )
+    parser.add_argument(
+        "--writer_threads",
+        type=int,
+        default=2,
+        help="Threads writing figures, JSON and Markdown in the background, 0 to write inline (default: 2)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Manifest of processed files, used to skip unchanged files on reruns (default: <save_dir>/manifest.jsonl)",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Process again the files the manifest records as done, without reusing cached pages",
+    )
     args = parser.parse_args()
 
-    # Load Model
-    model = DOLPHIN(args.model_path)
-
     # Collect Document Files (images and PDFs)
-    if os.path.isdir(args.input_path):
-        # Support both image and PDF files
-        file_extensions = [".jpg", ".jpeg", ".png", ".JPG", ".JPEG", ".PNG", ".pdf", ".PDF"]
-        
-        document_files = []
-        for ext in file_extensions:
-            document_files.extend(glob.glob(os.path.join(args.input_path, f"*{ext}")))
-        document_files = sorted(document_files)
-    else:
-        if not os.path.exists(args.input_path):
-            raise FileNotFoundError(f"Input path {args.input_path} does not exist")
-        
-        # Check if it's a supported file type
-        file_ext = os.path.splitext(args.input_path)[1].lower()
-        supported_exts = ['.jpg', '.jpeg', '.png', '.pdf']
-        
-        if file_ext not in supported_exts:
-            raise ValueError(f"Unsupported file type: {file_ext}. Supported types: {supported_exts}")
-        
-        document_files = [args.input_path]
+    document_files = collect_document_files(args.input_path)
 
     save_dir = args.save_dir or (
         args.input_path if os.path.isdir(args.input_path) else os.path.dirname(args.input_path)
     )
     setup_output_dirs(save_dir)
 
+    manifest = Manifest(args.manifest or os.path.join(save_dir, "manifest.jsonl"))
     total_samples = len(document_files)
-    print(f"\nTotal files to process: {total_samples}")
+    if not args.overwrite:
+        document_files = [file_path for file_path in document_files if not manifest.is_done(file_path)]
+    skipped = total_samples - len(document_files)
+
+    print(f"\nTotal files to process: {len(document_files)}")
+    if skipped:
+        print(f"Skipping {skipped} unchanged file(s) already processed according to {manifest.path}")
+    if not document_files:
+        return
+
+    if args.workers > 1:
+        done, failed = run_parallel(document_files, args, save_dir, manifest)
+        print(f"Processing completed: {done} done, {failed} failed. Results saved to {save_dir}")
+        return
+
+    # Load Model
+    model = DOLPHIN(args.model_path)
 
     # Process All Document Files
-    for file_path in document_files:
-        print(f"\nProcessing {file_path}")
-        try:
-            json_path, recognition_results = process_document(
-                document_path=file_path,
-                model=model,
-                save_dir=save_dir,
-                max_batch_size=args.max_batch_size,
+    with create_writer(args.writer_threads) as writer:
+        for file_path in document_files:
+            print(f"\nProcessing {file_path}")
+            status, fields = run_document(
+                file_path, model, save_dir, args.max_batch_size, args.trace, not args.overwrite, writer,
+                args.output_format,
             )
+            manifest.record(file_path, status, **fields)
 
-            print(f"Processing completed. Results saved to {save_dir}")
+            if status == "failed":
+                print(f"Error processing {file_path}: {fields['error']}")
+                continue
 
-        except Exception as e:
-            print(f"Error processing {file_path}: {str(e)}")
-            continue
+            print(f"Processing completed. Results saved to {save_dir}")
+            if args.trace:
+                print_timings(fields["timings"])
 
 
 if __name__ == "__main__":
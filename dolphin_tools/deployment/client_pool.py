@@ -0,0 +1,278 @@
+"""
+Load-balancing HTTP client for Dolphin inference servers.
+
+Spreads requests over several replicas of `vllm/api_server.py` or
+`tensorrt_llm/api_server.py`:
+- every replica keeps its own pool of keep-alive connections,
+- each request goes to the healthy replica with the fewest outstanding requests,
+- a replica that fails (connection error, timeout, 502, 503 or 504) is marked
+  unhealthy and the request is retried on another one; `/health` brings it back,
+- other errors, 500 included, are the request's fault: they are returned as
+  they are, without a retry and without changing the replica's health,
+- `apost` / `amap` offer the same over asyncio, for fanning out element crops.
+
+Example:
+    pool = ClientPool(["http://gpu-0:8000", "http://gpu-1:8000"])
+    response = pool.post("/generate", json=payload)
+    responses = asyncio.run(pool.amap("/generate", payloads))
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import httpx
+
+# Statuses meaning "this replica cannot serve the request right now". A 500 is
+# left out: a request the server fails on would fail on every replica, and take
+# them all out of rotation on the way
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class NoReplicaAvailableError(RuntimeError):
+    pass
+
+
+@dataclass
+class Replica:
+    url: str
+    client: httpx.Client
+    async_client: Optional[httpx.AsyncClient] = None
+    outstanding: int = 0
+    healthy: bool = True
+    failures: int = 0
+    last_failure: float = field(default=0.0)
+
+
+class ClientPool:
+    def __init__(self,
+                 urls: Sequence[str],
+                 timeout: float = 300.0,
+                 max_connections_per_replica: int = 16,
+                 max_attempts: Optional[int] = None,
+                 health_check_interval: float = 10.0):
+        """
+        Args:
+            urls: base URLs of the server replicas
+            timeout: request timeout in seconds
+            max_connections_per_replica: size of each replica's connection pool
+            max_attempts: replicas to try per request (default: all of them)
+            health_check_interval: seconds between `/health` checks of
+                unhealthy replicas, 0 to disable the background checks
+        """
+        if not urls:
+            raise ValueError("ClientPool needs at least one server URL")
+
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections_per_replica,
+                                   max_keepalive_connections=max_connections_per_replica)
+        self.replicas = [
+            Replica(url=url.rstrip("/"),
+                    client=httpx.Client(base_url=url.rstrip("/"), timeout=timeout, limits=self.limits))
+            for url in urls
+        ]
+        self.max_attempts = max_attempts or len(self.replicas)
+        self._lock = threading.Lock()
+        self._next = 0
+
+        self._closed = threading.Event()
+        self._health_thread = None
+        if health_check_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop,
+                                                   args=(health_check_interval,),
+                                                   name="client_pool_health",
+                                                   daemon=True)
+            self._health_thread.start()
+
+    # Replica selection
+
+    def _acquire(self, tried: set[str]) -> Replica:
+        with self._lock:
+            candidates = [replica for replica in self.replicas if replica.url not in tried]
+            if not candidates:
+                raise NoReplicaAvailableError("All replicas failed")
+            # Prefer healthy replicas, but an unhealthy one is better than none
+            candidates = [replica for replica in candidates if replica.healthy] or candidates
+
+            # Least outstanding requests; ties are rotated so that an idle
+            # pool still spreads the load
+            self._next = (self._next + 1) % len(self.replicas)
+            replica = min(candidates,
+                          key=lambda r: (r.outstanding, (self.replicas.index(r) - self._next) % len(self.replicas)))
+            replica.outstanding += 1
+            return replica
+
+    def _release(self, replica: Replica, failed: Optional[bool]) -> None:
+        # failed=None: the replica answered with an error of the request, its health is unchanged
+        with self._lock:
+            replica.outstanding -= 1
+            if failed:
+                replica.healthy = False
+                replica.failures += 1
+                replica.last_failure = time.monotonic()
+            elif failed is not None:
+                replica.healthy = True
+
+    @staticmethod
+    def _answered(response: httpx.Response) -> Optional[bool]:
+        # `failed` for _release of a response that is not retried
+        return None if response.status_code >= 500 else False
+
+    # Health checks
+
+    def check_health(self) -> dict[str, bool]:
+        """Check `/health` on every replica and return the health per URL."""
+        for replica in self.replicas:
+            try:
+                healthy = replica.client.get("/health", timeout=5.0).status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            with self._lock:
+                replica.healthy = healthy
+        return {replica.url: replica.healthy for replica in self.replicas}
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            for replica in self.replicas:
+                if replica.healthy:
+                    continue
+                try:
+                    healthy = replica.client.get("/health", timeout=5.0).status_code == 200
+                except httpx.HTTPError:
+                    healthy = False
+                if healthy:
+                    with self._lock:
+                        replica.healthy = True
+
+    # Sync interface
+
+    def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        """POST to the least busy replica, retrying on another one on failure."""
+        return self.request("POST", path, **kwargs)
+
+    def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        tried: set[str] = set()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            replica = self._acquire(tried)
+            tried.add(replica.url)
+            failed = True
+            try:
+                response = replica.client.request(method, path, **kwargs)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    last_error = httpx.HTTPStatusError(f"{replica.url} returned {response.status_code}",
+                                                       request=response.request, response=response)
+                    continue
+                failed = self._answered(response)
+                return response
+            except httpx.TransportError as e:
+                last_error = e
+            finally:
+                self._release(replica, failed)
+        raise NoReplicaAvailableError(f"Request failed on {len(tried)} replica(s): {last_error}")
+
+    @contextlib.contextmanager
+    def stream(self, method: str, path: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        """Streaming request; only failures before the response starts are retried."""
+        tried: set[str] = set()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            replica = self._acquire(tried)
+            tried.add(replica.url)
+            failed = True
+            try:
+                with replica.client.stream(method, path, **kwargs) as response:
+                    if response.status_code in RETRYABLE_STATUS_CODES:
+                        last_error = httpx.HTTPStatusError(f"{replica.url} returned {response.status_code}",
+                                                           request=response.request, response=response)
+                        continue
+                    failed = self._answered(response)
+                    yield response
+                    return
+            except httpx.TransportError as e:
+                if failed is not True:
+                    raise
+                last_error = e
+            finally:
+                self._release(replica, failed)
+        raise NoReplicaAvailableError(f"Request failed on {len(tried)} replica(s): {last_error}")
+
+    # Async interface
+
+    def _async_client(self, replica: Replica) -> httpx.AsyncClient:
+        if replica.async_client is None:
+            replica.async_client = httpx.AsyncClient(base_url=replica.url, timeout=self.timeout, limits=self.limits)
+        return replica.async_client
+
+    async def apost(self, path: str, **kwargs: Any) -> httpx.Response:
+        """Async POST to the least busy replica, retrying on another one on failure."""
+        tried: set[str] = set()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            replica = self._acquire(tried)
+            tried.add(replica.url)
+            failed = True
+            try:
+                response = await self._async_client(replica).post(path, **kwargs)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    last_error = httpx.HTTPStatusError(f"{replica.url} returned {response.status_code}",
+                                                       request=response.request, response=response)
+                    continue
+                failed = self._answered(response)
+                return response
+            except httpx.TransportError as e:
+                last_error = e
+            finally:
+                self._release(replica, failed)
+        raise NoReplicaAvailableError(f"Request failed on {len(tried)} replica(s): {last_error}")
+
+    async def amap(self, path: str, payloads: Sequence[dict], max_concurrency: Optional[int] = None,
+                   **kwargs: Any) -> list[httpx.Response]:
+        """POST every JSON payload concurrently, returning the responses in order."""
+        results = [None] * len(payloads)
+        async for index, response in self.aiter_completed(path, payloads, max_concurrency, **kwargs):
+            results[index] = response
+        return results
+
+    async def aiter_completed(self, path: str, payloads: Sequence[dict], max_concurrency: Optional[int] = None,
+                              **kwargs: Any) -> AsyncIterator[tuple[int, httpx.Response]]:
+        """Like amap, but yields (index, response) as each request finishes."""
+        # Stay within the connection pools, so requests never wait on (and
+        # time out in) a full pool
+        semaphore = asyncio.Semaphore(max_concurrency or self.limits.max_connections * len(self.replicas))
+
+        async def post_one(index: int, payload: dict) -> tuple[int, httpx.Response]:
+            async with semaphore:
+                return index, await self.apost(path, json=payload, **kwargs)
+
+        tasks = [asyncio.ensure_future(post_one(i, payload)) for i, payload in enumerate(payloads)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Lifecycle
+
+    def close(self) -> None:
+        self._closed.set()
+        for replica in self.replicas:
+            replica.client.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        for replica in self.replicas:
+            if replica.async_client is not None:
+                await replica.async_client.aclose()
+                replica.async_client = None
+
+    def __enter__(self) -> "ClientPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,82 @@
+"""
+Input image decoding for the Dolphin inference servers.
+
+Images arrive base64 encoded (`/generate`), as encoded files or as raw uint8
+pixels in HWC order (`/generate_raw`, `/generate_batch_raw`). Decoding,
+base64 included, is CPU bound and runs on a thread pool so the event loop
+keeps serving other requests. Invalid images and shapes raise a 400.
+
+Example:
+    decoder = ImageDecoder(metrics.image_decode)
+    image = await decoder.decode_bytes(body, parse_image_shape(request.headers.get("x-image-shape")))
+"""
+
+import asyncio
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from PIL import Image
+
+
+def check_image_shape(image_shape: Any) -> list[int]:
+    """[height, width, channels] of a raw image, 400 unless 3 positive ints with 1 or 3 channels"""
+    if (not isinstance(image_shape, (list, tuple)) or
+            len(image_shape) != 3 or
+            not all(isinstance(dim, int) and not isinstance(dim, bool) and dim > 0 for dim in image_shape) or
+            image_shape[2] not in (1, 3)):
+        raise HTTPException(status_code=400, detail=f"Invalid image shape: {image_shape!r}")
+    return list(image_shape)
+
+
+def parse_image_shape(image_shape: Optional[str]) -> Optional[list[int]]:
+    # X-Image-Shape header, "height,width,channels"
+    if image_shape is None:
+        return None
+    try:
+        dims = [int(dim) for dim in image_shape.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid X-Image-Shape header")
+    return check_image_shape(dims)
+
+
+def decode_image_data(image_data: bytes, image_shape: Optional[list[int]] = None) -> Image.Image:
+    if image_shape is None:
+        # Encoded image file, convert() forces the (lazy) decoding here
+        return Image.open(io.BytesIO(image_data)).convert("RGB")
+
+    height, width, channels = image_shape
+    if channels not in (1, 3) or len(image_data) != height * width * channels:
+        raise ValueError(f"Raw image of {len(image_data)} bytes does not match shape {image_shape}")
+    mode = "RGB" if channels == 3 else "L"
+    return Image.frombytes(mode, (width, height), image_data).convert("RGB")
+
+
+class ImageDecoder:
+    """Decodes images on a thread pool, timing each decode in `histogram`"""
+
+    def __init__(self, histogram, max_workers: int = 4):
+        self.histogram = histogram
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image_decode")
+
+    def _decode(self, image_data: bytes, image_shape: Optional[list[int]], is_base64: bool) -> Image.Image:
+        with self.histogram.time():
+            if is_base64:
+                image_data = base64.b64decode(image_data)
+            return decode_image_data(image_data, image_shape)
+
+    async def _run(self, image_data, image_shape: Optional[list[int]], is_base64: bool) -> Image.Image:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self._decode, image_data, image_shape, is_base64)
+        except (ValueError, OSError) as e:
+            # binascii.Error of a bad base64 string is a ValueError
+            raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+
+    async def decode_bytes(self, image_data: bytes, image_shape: Optional[list[int]] = None) -> Image.Image:
+        return await self._run(image_data, image_shape, False)
+
+    async def decode_base64(self, image_base64: str) -> Image.Image:
+        return await self._run(image_base64, None, True)
@@ -0,0 +1,237 @@
+"""
+Minimal Prometheus metrics for the Dolphin inference servers.
+
+Implements counters, gauges and histograms rendered in the Prometheus text
+exposition format, without depending on `prometheus_client`. Metrics are safe
+to update from worker threads (image decoding, the TensorRT-LLM runner).
+
+Example:
+    registry = Registry()
+    latency = registry.histogram("request_latency_seconds", "Request latency", ["prompt_type"])
+    latency.observe(0.42, prompt_type="text")
+    registry.render()
+"""
+
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DECODE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Known Dolphin prompts, so latencies can be split by task without one label
+# value per free-form prompt
+PROMPT_TYPES = {
+    "Parse the reading order of this document.": "layout",
+    "Read text in the image.": "text",
+    "Parse the table in the image.": "table",
+    "Read formula in the image.": "formula",
+    "Read code in the image.": "code",
+}
+
+
+def prompt_type(prompt: str) -> str:
+    return PROMPT_TYPES.get(prompt.strip(), "other")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if not self.labelnames:
+            # Export unlabelled metrics before their first update
+            self._values[()] = self._initial_value()
+
+    def _initial_value(self):
+        return 0.0
+
+    def _key(self, labels: dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value at scrape time."""
+        self._function = function
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        if self._function is not None:
+            yield self.name, {}, self._function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _initial_value(self):
+        # [bucket counts..., sum]
+        return [0] * len(self.buckets) + [0.0]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, self._initial_value())
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in values:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, state):
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count
+            yield f"{self.name}_count", labels, state[len(self.buckets) - 1]
+            yield f"{self.name}_sum", labels, state[-1]
+
+
+class Registry:
+    def __init__(self, prefix: str = "dolphin_"):
+        self.prefix = prefix
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+class InferenceMetrics:
+    """The metrics shared by the vLLM and TensorRT-LLM servers."""
+
+    def __init__(self, registry: Optional[Registry] = None):
+        self.registry = registry or Registry()
+        r = self.registry
+        self.queue_depth = r.gauge("queue_depth", "Requests waiting to be scheduled")
+        self.requests_in_flight = r.gauge("requests_in_flight", "Requests being served")
+        self.batch_size = r.histogram("batch_size", "Number of requests per batch", buckets=BATCH_SIZE_BUCKETS)
+        self.time_to_first_token = r.histogram("time_to_first_token_seconds",
+                                               "Time from request arrival to the first generated token",
+                                               ["prompt_type"])
+        self.request_latency = r.histogram("request_latency_seconds", "Time from request arrival to the full output",
+                                           ["prompt_type"])
+        self.generated_tokens = r.counter("generated_tokens_total", "Generated tokens", ["prompt_type"])
+        self.tokens_per_second = r.histogram("tokens_per_second", "Generation throughput of each request",
+                                             ["prompt_type"], buckets=THROUGHPUT_BUCKETS)
+        self.image_decode = r.histogram("image_decode_seconds", "Time to decode an input image",
+                                        buckets=DECODE_BUCKETS)
+
+    def observe_request(self, prompt: str, latency: float, num_tokens: int,
+                        time_to_first_token: Optional[float] = None,
+                        generation_time: Optional[float] = None) -> None:
+        """Record a finished request.
+
+        Tokens/sec is computed over `generation_time` if given, else over the
+        time after the first token (or the whole latency if that is unknown).
+        """
+        label = prompt_type(prompt)
+        self.request_latency.observe(latency, prompt_type=label)
+        self.generated_tokens.inc(num_tokens, prompt_type=label)
+        if time_to_first_token is not None:
+            self.time_to_first_token.observe(time_to_first_token, prompt_type=label)
+        decode_time = generation_time if generation_time is not None else latency - (time_to_first_token or 0.0)
+        if num_tokens > 0 and decode_time > 0:
+            self.tokens_per_second.observe(num_tokens / decode_time, prompt_type=label)
+
+    def render(self) -> str:
+        return self.registry.render()
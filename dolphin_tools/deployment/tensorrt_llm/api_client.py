@@ -11,11 +11,19 @@ For production use, we recommend `vllm serve` and the OpenAI client API.
 
 import argparse
 import base64
+import contextlib
 import json
+import os
+import sys
 from argparse import Namespace
 from collections.abc import Iterable
+from typing import Optional
 
-import requests
+import httpx
+
+# The client pool is shared by the vllm and tensorrt_llm clients
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client_pool import ClientPool  # noqa: E402
 
 
 def clear_line(n: int = 1) -> None:
@@ -36,28 +44,33 @@ def encode_image_base64(image_path: str) -> str:
 
 
 def post_http_request(
-        prompt: str, image_path: str, api_url: str, stream: bool = False
-) -> requests.Response:
+        prompt: str, image_path: str, pool: ClientPool, stream: bool = False,
+        max_new_tokens: Optional[int] = None, num_beams: int = 1
+) -> contextlib.AbstractContextManager[httpx.Response]:
+    """POST through the pool; the response must be used inside the returned context."""
     headers = {"User-Agent": "Test Client"}
     pload = {
         "prompt": prompt,
         "image_base64": encode_image_base64(image_path),
+        "num_beams": num_beams,
+        "stream": stream,
     }
-    response = requests.post(api_url, headers=headers, json=pload, stream=stream)
-    return response
+    if max_new_tokens is not None:
+        pload["max_new_tokens"] = max_new_tokens
+    if stream:
+        return pool.stream("POST", "/generate", headers=headers, json=pload)
+    return contextlib.nullcontext(pool.post("/generate", headers=headers, json=pload))
 
 
-def get_streaming_response(response: requests.Response) -> Iterable[list[str]]:
-    for chunk in response.iter_lines(
-            chunk_size=8192, decode_unicode=False, delimiter=b"\n"
-    ):
+def get_streaming_response(response: httpx.Response) -> Iterable[str]:
+    for chunk in response.iter_lines():
         if chunk:
-            data = json.loads(chunk.decode("utf-8"))
+            data = json.loads(chunk)
             output = data["text"]
             yield output
 
 
-def get_response(response: requests.Response) -> list[str]:
+def get_response(response: httpx.Response) -> list[str]:
     data = json.loads(response.content)
     output = data["text"]
     return output
@@ -67,32 +80,35 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", type=str, default="localhost")
     parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--urls", type=str, nargs="+", default=None,
+                        help="Base URLs of several server replicas to balance over (default: http://host:port)")
     parser.add_argument("--prompt", type=str, default="Parse the reading order of this document.")
     parser.add_argument("--image_path", type=str, default="./demo/page_imgs/page_1.jpeg")
     parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--max_new_tokens", type=int, default=None,
+                        help="Token budget for this request (default: the server's --max_new_tokens)")
+    parser.add_argument("--num_beams", type=int, default=1, help="Use beam search if num_beams > 1")
     return parser.parse_args()
 
 
 def main(args: Namespace):
     prompt = args.prompt
     image_path = args.image_path
-    api_url = f"http://{args.host}:{args.port}/generate"
     stream = args.stream
 
     print(f"Prompt: {prompt!r}\n", flush=True)
-    response = post_http_request(prompt, image_path, api_url, stream)
-
-    if stream:
-        num_printed_lines = 0
-        for h in get_streaming_response(response):
-            clear_line(num_printed_lines)
-            num_printed_lines = 0
-            for i, line in enumerate(h):
-                num_printed_lines += 1
-                print(f"Response {i}: {line!r}", flush=True)
-    else:
-        output = get_response(response)
-        print(f"Response: {output!r}", flush=True)
+    with ClientPool(args.urls or [f"http://{args.host}:{args.port}"]) as pool:
+        with post_http_request(prompt, image_path, pool, stream,
+                               max_new_tokens=args.max_new_tokens, num_beams=args.num_beams) as response:
+            if stream:
+                num_printed_lines = 0
+                for text in get_streaming_response(response):
+                    clear_line(num_printed_lines)
+                    print(f"Response: {text!r}", flush=True)
+                    num_printed_lines = 1
+            else:
+                output = get_response(response)
+                print(f"Response: {output!r}", flush=True)
 
 
 if __name__ == "__main__":
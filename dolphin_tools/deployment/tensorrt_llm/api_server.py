@@ -2,76 +2,316 @@
 
 #!/usr/bin/env python
 import asyncio
-import base64
-import io
+import functools
+import json
 import logging
+import os
 import signal
+import sys
+import threading
+import time
+from collections.abc import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from http import HTTPStatus
 from PIL import Image
 from typing import Optional
 
 import click
 import uvicorn
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+import tensorrt_llm.profiler as profiler
 from tensorrt_llm.executor import CppExecutorError, RequestError
 from dolphin_runner import DolphinRunner, InferenceConfig
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_decode import ImageDecoder, parse_image_shape  # noqa: E402
+from metrics import CONTENT_TYPE, InferenceMetrics  # noqa: E402
+
 TIMEOUT_KEEP_ALIVE = 5  # seconds.
 
+metrics = InferenceMetrics()
+# Image decoding is CPU bound, keep it off the event loop
+image_decoder = ImageDecoder(metrics.image_decode)
+# Time accumulated by the tensorrt_llm profiler timers of DolphinRunner.generate
+profiler_seconds = metrics.registry.gauge("trt_profiler_seconds", "Total time recorded by the tensorrt_llm profiler",
+                                          ["stage"])
+PROFILER_STAGES = ("Generate", "LLM")
+
+
+@dataclass
+class PendingRequest:
+    prompt: str
+    image: Image.Image
+    future: asyncio.Future
+    max_new_tokens: int
+    num_beams: int
+    stop_words: list[str]
+    arrival_time: float = field(default_factory=time.perf_counter)
 
-async def decode_image(image_base64: str) -> Image.Image:
-    image_data = base64.b64decode(image_base64)
-    image = Image.open(io.BytesIO(image_data))
-    return image
+    @property
+    def batch_key(self):
+        # Prompts of different lengths cannot share a batch: the runner slices
+        # the outputs at the (common) decoder prompt length. Budgets are
+        # bucketed by power of two so that short element crops are not batched
+        # with (and do not reserve the KV cache of) full page requests.
+        budget_bucket = 1 << (self.max_new_tokens - 1).bit_length()
+        return self.prompt, self.num_beams, budget_bucket
 
 
 class LlmServer:
-    def __init__(self, runner: DolphinRunner):
+    def __init__(self, runner: DolphinRunner, max_batch_wait_ms: float = 5.0):
         self.runner = runner
+        self.max_batch_size = runner.args.batch_size
+        self.max_new_tokens = runner.args.max_new_tokens
+        self.max_batch_wait = max_batch_wait_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        # The runner is not thread safe, so every batch runs on the same worker thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dolphin_runner")
         self.app = FastAPI()
         self.register_routes()
+        # Requests accepted but not started on the runner yet: in the queue, gathered by
+        # batch_loop behind the running batch, or streams waiting for the worker thread.
+        # Only changed on the event loop.
+        self.waiting = 0
+        metrics.queue_depth.set_function(lambda: self.waiting)
 
     def register_routes(self):
+        self.app.middleware("http")(self.record_arrival_time)
         self.app.add_api_route("/health", self.health, methods=["GET"])
+        self.app.add_api_route("/metrics", self.get_metrics, methods=["GET"])
         self.app.add_api_route("/generate", self.generate, methods=["POST"])
+        self.app.add_api_route("/generate_raw", self.generate_raw, methods=["POST"])
+
+    async def record_arrival_time(self, request: Request, call_next):
+        # Latencies are measured from here, so they include reading and decoding the image
+        request.state.arrival_time = time.perf_counter()
+        return await call_next(request)
 
     async def health(self) -> Response:
         return Response(status_code=200)
 
+    async def get_metrics(self) -> Response:
+        """ Prometheus metrics. """
+        for stage in PROFILER_STAGES:
+            profiler_seconds.set(profiler.elapsed_time_in_sec(stage) or 0.0, stage=stage)
+        return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
     async def generate(self, request: Request) -> Response:
         """ Generate completion for the request.
 
         The request should be a JSON object with the following fields:
         - prompt: the prompt to use for the generation.
         - image_base64: the image to use for the generation.
+        - max_new_tokens: optional token budget, capped by --max_new_tokens.
+        - num_beams: optional beam width, 1 for greedy decoding.
+        - stop: optional stop string or list of stop strings. They are given to
+          the engine as stop words when the installed TensorRT-LLM session
+          accepts a stop_words_list, so generation ends there (a batch ends
+          once all its requests have stopped); otherwise they only truncate
+          the output.
+        - stream: whether to stream the text as it is generated.
+        - stream_format: "ndjson" (default) or "sse" for server-sent events.
         """
         request_dict = await request.json()
 
         prompt = request_dict.pop("prompt", "")
-        logging.info(f"request prompt: {prompt}")
         image_base64 = request_dict.pop("image_base64", "")
-        image = await decode_image(image_base64)
+        image = await image_decoder.decode_base64(image_base64)
+        return await self._generate(prompt, image, request_dict, request.state.arrival_time)
+
+    async def generate_raw(self, request: Request) -> Response:
+        """ Generate completion for an image sent as the raw request body.
+
+        Same as `/generate` without the base64 overhead:
+        - body: the encoded image file (PNG, JPEG, ...), or raw uint8 pixels in
+          HWC order when the `X-Image-Shape: height,width,channels` header is set.
+        - `X-Generate-Params` header: JSON object with the other `/generate` fields.
+        """
+        try:
+            request_dict = json.loads(request.headers.get("x-generate-params", "{}"))
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid X-Generate-Params header")
+
+        prompt = request_dict.pop("prompt", "")
+        image_shape = parse_image_shape(request.headers.get("x-image-shape"))
+        image = await image_decoder.decode_bytes(await request.body(), image_shape)
+        return await self._generate(prompt, image, request_dict, request.state.arrival_time)
 
+    async def _generate(self, prompt: str, image: Image.Image, request_dict: dict,
+                        arrival_time: float) -> Response:
+        logging.info(f"request prompt: {prompt}")
         try:
-            output_texts = self.runner.run([prompt], [image], 4024)
-            output_texts = [texts[0] for texts in output_texts]
-            return JSONResponse({"text": output_texts[0]})
+            max_new_tokens = int(request_dict.get("max_new_tokens", self.max_new_tokens))
+            num_beams = int(request_dict.get("num_beams", self.runner.args.num_beams))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="max_new_tokens and num_beams must be integers")
+        if max_new_tokens < 1 or num_beams < 1:
+            raise HTTPException(status_code=400, detail="max_new_tokens and num_beams must be positive")
+        stop_words = request_dict.get("stop") or []
+        if isinstance(stop_words, str):
+            stop_words = [stop_words]
+
+        future = asyncio.get_running_loop().create_future()
+        pending_request = PendingRequest(
+            prompt, image, future,
+            max_new_tokens=min(max_new_tokens, self.max_new_tokens),
+            num_beams=num_beams,
+            stop_words=stop_words,
+            arrival_time=arrival_time,
+        )
+        if request_dict.get("stream", False):
+            return self.stream(pending_request, sse=request_dict.get("stream_format") == "sse")
+
+        self.waiting += 1
+        await self.queue.put(pending_request)
+        try:
+            output_text = await future
+            return JSONResponse({"text": output_text})
         except RequestError as e:
             return JSONResponse(content=str(e),
                                 status_code=HTTPStatus.BAD_REQUEST)
-        except CppExecutorError:
-            # If internal executor error is raised, shutdown the server
-            signal.raise_signal(signal.SIGINT)
+
+    def stream(self, request: PendingRequest, sse: bool = False) -> StreamingResponse:
+        """ Stream the text generated so far, one JSON object per update.
+
+        Streaming requests are not batched: they run alone on the runner
+        worker thread, between the regular batches.
+        """
+        loop = asyncio.get_running_loop()
+        updates = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def run():
+            loop.call_soon_threadsafe(self.started, 1)
+            metrics.batch_size.observe(1)
+            output_stream = self.runner.run_stream([request.prompt], [request.image], [request.max_new_tokens],
+                                                   num_beams=request.num_beams,
+                                                   stop_words=[request.stop_words])
+            time_to_first_token = None
+            try:
+                for output_texts in output_stream:
+                    if cancelled.is_set():
+                        break
+                    if time_to_first_token is None and output_texts[0][0]:
+                        time_to_first_token = time.perf_counter() - request.arrival_time
+                    loop.call_soon_threadsafe(updates.put_nowait, output_texts[0][0])
+                else:
+                    metrics.observe_request(request.prompt, time.perf_counter() - request.arrival_time,
+                                            self.runner.num_generated_tokens[0], time_to_first_token)
+            except Exception as e:
+                loop.call_soon_threadsafe(updates.put_nowait, e)
+            finally:
+                output_stream.close()
+                loop.call_soon_threadsafe(updates.put_nowait, None)
+
+        self.waiting += 1
+        self.executor.submit(run)
+
+        async def stream_results() -> AsyncGenerator[bytes, None]:
+            text = None
+            try:
+                while (update := await updates.get()) is not None:
+                    if isinstance(update, Exception):
+                        ret = {"error": str(update)}
+                        if isinstance(update, CppExecutorError):
+                            # If internal executor error is raised, shutdown the server
+                            signal.raise_signal(signal.SIGINT)
+                    elif update == text:
+                        continue
+                    else:
+                        text = update
+                        ret = {"text": text}
+                    data = json.dumps(ret)
+                    yield (f"data: {data}\n\n" if sse else data + "\n").encode("utf-8")
+            finally:
+                cancelled.set()
+
+        media_type = "text/event-stream" if sse else "application/x-ndjson"
+        return StreamingResponse(stream_results(), media_type=media_type)
+
+    def started(self, count: int):
+        # `count` waiting requests reached the runner
+        self.waiting -= count
+
+    async def batch_loop(self):
+        """ Gather pending requests into batches and run them on the worker thread.
+
+        Requests arriving while a batch runs are queued, and are picked up
+        together by the next iteration.
+        """
+        while True:
+            pending = [await self.queue.get()]
+            if self.max_batch_wait > 0:
+                await asyncio.sleep(self.max_batch_wait)
+            while not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+
+            groups = {}
+            for request in pending:
+                # Skip requests whose client went away while queued
+                if not request.future.done():
+                    groups.setdefault(request.batch_key, []).append(request)
+                else:
+                    self.waiting -= 1
+
+            for group in groups.values():
+                for i in range(0, len(group), self.max_batch_size):
+                    await self.run_batch(group[i:i + self.max_batch_size])
+
+    async def run_batch(self, batch: list[PendingRequest]):
+        loop = asyncio.get_running_loop()
+        prompts = [request.prompt for request in batch]
+        images = [request.image for request in batch]
+        run = functools.partial(
+            self.runner.run,
+            prompts,
+            images,
+            [request.max_new_tokens for request in batch],
+            num_beams=batch[0].num_beams,
+            stop_words=[request.stop_words for request in batch],
+        )
+        metrics.batch_size.observe(len(batch))
+
+        def run_and_count():
+            loop.call_soon_threadsafe(self.started, len(batch))
+            start = time.perf_counter()
+            output_texts = run()
+            return output_texts, self.runner.num_generated_tokens, time.perf_counter() - start
+
+        try:
+            output_texts, num_tokens, generation_time = await loop.run_in_executor(self.executor, run_and_count)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            if isinstance(e, CppExecutorError):
+                # If internal executor error is raised, shutdown the server
+                signal.raise_signal(signal.SIGINT)
+            return
+
+        now = time.perf_counter()
+        for request, texts, request_tokens in zip(batch, output_texts, num_tokens):
+            metrics.observe_request(request.prompt, now - request.arrival_time, request_tokens,
+                                    generation_time=generation_time)
+            if not request.future.done():
+                request.future.set_result(texts[0])
 
     async def __call__(self, host, port):
+        self.queue = asyncio.Queue()
+        batch_task = asyncio.create_task(self.batch_loop())
+
         config = uvicorn.Config(self.app,
                                 host=host,
                                 port=port,
                                 log_level="info",
                                 timeout_keep_alive=TIMEOUT_KEEP_ALIVE)
-        await uvicorn.Server(config).serve()
+        try:
+            await uvicorn.Server(config).serve()
+        finally:
+            batch_task.cancel()
 
 
 @click.command()
@@ -80,6 +320,8 @@ class LlmServer:
 @click.option("--llm_engine_dir", type=str, required=True)
 @click.option("--max_batch_size", type=int, default=16)
 @click.option("--max_new_tokens", type=int, default=4024)
+@click.option("--max_batch_wait_ms", type=float, default=5.0,
+              help="How long to wait for more requests before running a batch")
 @click.option("--host", type=str, default=None)
 @click.option("--port", type=int, default=8000)
 def entrypoint(hf_model_dir: str,
@@ -87,6 +329,7 @@ def entrypoint(hf_model_dir: str,
                llm_engine_dir: str,
                max_batch_size: int,
                max_new_tokens: int,
+               max_batch_wait_ms: float,
                host: Optional[str] = None,
                port: int = 8000):
     host = host or "0.0.0.0"
@@ -103,7 +346,7 @@ def entrypoint(hf_model_dir: str,
     )
 
     dolphin_runner = DolphinRunner(config)
-    server = LlmServer(runner=dolphin_runner)
+    server = LlmServer(runner=dolphin_runner, max_batch_wait_ms=max_batch_wait_ms)
 
     asyncio.run(server(host, port))
 
@@ -3,6 +3,7 @@ Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 SPDX-License-Identifier: MIT
 """
 
+import inspect
 import json
 import os
 from typing import Optional
@@ -62,6 +63,7 @@ class InferenceConfig(BaseModel):
 class DolphinRunner(MultimodalModelRunner):
     def __init__(self, args):
         self.args = args
+        self.num_generated_tokens = []
 
         self.runtime_rank = mpi_rank()
         device_id = self.runtime_rank % torch.cuda.device_count()
@@ -111,7 +113,7 @@ class DolphinRunner(MultimodalModelRunner):
         assert self.model_type == 'nougat'
         self.processor = DonutProcessor.from_pretrained(self.args.hf_model_dir, use_fast=True)
 
-    def run(self, input_texts, input_images, max_new_tokens):
+    def prepare_inputs(self, input_texts, input_images):
         prompts = [f"<s>{text.strip()} <Answer/>" for text in input_texts]
         images = self.processor(input_images, return_tensors="pt")['pixel_values'].to("cuda")
         prompt_ids = self.tokenizer(prompts, add_special_tokens=False, return_tensors="pt").input_ids.to("cuda")
@@ -124,16 +126,43 @@ class DolphinRunner(MultimodalModelRunner):
         logger.info(f"prompt_ids: {prompt_ids}, size: {prompt_ids.size()}, dtype: {prompt_ids.dtype}")
         logger.info("---------------------------------------------------------")
 
+        return images, prompt_ids
+
+    def run(self, input_texts, input_images, max_new_tokens, num_beams=None, stop_words=None):
+        """Run a batch of prompts and images.
+
+        Args:
+            max_new_tokens: budget shared by the batch, or one budget per request
+            num_beams: beam width, 1 for greedy decoding (default: args.num_beams)
+            stop_words: optional list of stop strings per request
+        """
+        images, prompt_ids = self.prepare_inputs(input_texts, input_images)
+
         output_texts = self.generate(input_texts,
                                      [None] * len(input_texts),
                                      images,
                                      prompt_ids,
                                      max_new_tokens,
                                      warmup=False,
+                                     num_beams=num_beams,
+                                     stop_words=stop_words,
                                      )
 
         return output_texts
 
+    def run_stream(self, input_texts, input_images, max_new_tokens, num_beams=None, stop_words=None):
+        """Like run(), but yields the output texts decoded so far after every generation step."""
+        images, prompt_ids = self.prepare_inputs(input_texts, input_images)
+
+        yield from self.generate_stream(input_texts,
+                                        [None] * len(input_texts),
+                                        images,
+                                        prompt_ids,
+                                        max_new_tokens,
+                                        num_beams=num_beams,
+                                        stop_words=stop_words,
+                                        )
+
     def generate(self,
                  pre_prompt,
                  post_prompt,
@@ -142,7 +171,9 @@ class DolphinRunner(MultimodalModelRunner):
                  max_new_tokens,
                  warmup=False,
                  other_vision_inputs={},
-                 other_decoder_inputs={}):
+                 other_decoder_inputs={},
+                 num_beams=None,
+                 stop_words=None):
         if not warmup:
             profiler.start("Generate")
         input_ids, input_lengths, ptuning_args, visual_features = self.preprocess(
@@ -150,12 +181,115 @@ class DolphinRunner(MultimodalModelRunner):
 
         if warmup: return None
 
+        num_beams, batch_size, budgets, stop_words = self.generation_options(
+            decoder_input_ids, max_new_tokens, num_beams, stop_words)
+
+        profiler.start("LLM")
+        output_ids = self.llm_generate(pre_prompt, input_ids, visual_features, ptuning_args,
+                                       decoder_input_ids, max(budgets), num_beams, stop_words=stop_words)
+        profiler.stop("LLM")
+
+        if mpi_rank() == 0:
+            stripped_text = self.decode_outputs(output_ids, decoder_input_ids.shape[1], batch_size,
+                                                budgets, num_beams, stop_words)
+            profiler.stop("Generate")
+            return stripped_text
+        else:
+            profiler.stop("Generate")
+            return None
+
+    def generate_stream(self,
+                        pre_prompt,
+                        post_prompt,
+                        image,
+                        decoder_input_ids,
+                        max_new_tokens,
+                        other_vision_inputs={},
+                        num_beams=None,
+                        stop_words=None):
+        """Streaming variant of generate(), built on the LLM session's streaming mode.
+
+        If the session cannot stream, the final texts are yielded once.
+        """
+        if "streaming" not in inspect.signature(self.model.generate).parameters:
+            yield self.generate(pre_prompt, post_prompt, image, decoder_input_ids, max_new_tokens,
+                                other_vision_inputs=other_vision_inputs, num_beams=num_beams,
+                                stop_words=stop_words)
+            return
+
+        profiler.start("Generate")
+        profiler.start("LLM")
+        try:
+            input_ids, input_lengths, ptuning_args, visual_features = self.preprocess(
+                False, pre_prompt, post_prompt, image, other_vision_inputs)
+            num_beams, batch_size, budgets, stop_words = self.generation_options(
+                decoder_input_ids, max_new_tokens, num_beams, stop_words)
+
+            for output_ids in self.llm_generate(pre_prompt, input_ids, visual_features, ptuning_args,
+                                                decoder_input_ids, max(budgets), num_beams, stop_words=stop_words,
+                                                streaming=True):
+                if mpi_rank() == 0:
+                    yield self.decode_outputs(output_ids, decoder_input_ids.shape[1], batch_size,
+                                              budgets, num_beams, stop_words)
+        finally:
+            profiler.stop("LLM")
+            profiler.stop("Generate")
+
+    def generation_options(self, decoder_input_ids, max_new_tokens, num_beams, stop_words):
+        num_beams = num_beams or self.args.num_beams
+        batch_size = min(self.args.batch_size, decoder_input_ids.shape[0])
+        # The batch is generated with the largest budget, then every output is
+        # cut to its own budget and at its first stop word. The engine itself
+        # stops a request at its stop word when the session supports it.
+        if isinstance(max_new_tokens, int):
+            budgets = [max_new_tokens] * batch_size
+        else:
+            budgets = list(max_new_tokens)
+        stop_words = stop_words or [[]] * batch_size
+        return num_beams, batch_size, budgets, stop_words
+
+    @property
+    def supports_stop_words(self):
+        # Whether the LLM session of the installed TensorRT-LLM takes a stop_words_list
+        return "stop_words_list" in inspect.signature(self.model.generate).parameters
+
+    def stop_words_list(self, stop_words):
+        """Stop words of each request in TensorRT-LLM's stop_words_list format, None if there are none
+
+        A [batch_size, 2, length] int32 tensor: the token ids of the request's
+        stop words back to back, then the offset where each one ends, padded
+        with -1. A stop word is matched on the tokens of the string encoded
+        alone; when the model tokenizes it differently in context, the engine
+        does not stop early and decode_outputs still cuts the text.
+        """
+        if not any(stop_words):
+            return None
+        words_ids, words_offsets = [], []
+        for words in stop_words:
+            ids, offsets = [], []
+            for word in words:
+                word_ids = self.tokenizer.encode(word, add_special_tokens=False)
+                if word_ids:
+                    ids.extend(word_ids)
+                    offsets.append(len(ids))
+            words_ids.append(ids)
+            words_offsets.append(offsets)
+
+        length = max(len(ids) for ids in words_ids) or 1
+        stop_words_list = torch.zeros((len(stop_words), 2, length), dtype=torch.int32)
+        stop_words_list[:, 1, :] = -1
+        for batch_idx, (ids, offsets) in enumerate(zip(words_ids, words_offsets)):
+            stop_words_list[batch_idx, 0, :len(ids)] = torch.tensor(ids, dtype=torch.int32)
+            stop_words_list[batch_idx, 1, :len(offsets)] = torch.tensor(offsets, dtype=torch.int32)
+        return stop_words_list.to("cuda").contiguous()
+
+    def llm_generate(self, pre_prompt, input_ids, visual_features, ptuning_args,
+                     decoder_input_ids, max_new_tokens, num_beams, stop_words=None, **kwargs):
         # use prompt tuning to pass multimodal features
         # model.generate() expects the following params (see layers/embedding.py):
         # args[0]: prompt embedding table, [batch_size, multimodal_len, hidden_size], later flattened to [batch_size * multimodal_len, hidden_size]
         # args[1]: prompt task ids, [batch_size]. in multimodal case, arange(batch_size), i.e. in VILA batching mode 2, each image is treated separately in the batch instead of concated together (although the prompt embedding table has to be concated)
         # args[2]: prompt task vocab size, [1]. assuming all table has the same length, which in multimodal case equals to multimodal_len
-        profiler.start("LLM")
         if self.model_type in ['nougat', 'pix2struct']:
             # Trim encoder input_ids to match visual features shape
             ids_shape = (min(self.args.batch_size, len(pre_prompt)), visual_features.shape[1])
@@ -164,11 +298,18 @@ class DolphinRunner(MultimodalModelRunner):
             elif self.model_type == 'pix2struct':
                 input_ids = torch.ones(ids_shape, dtype=torch.int32)
 
-        output_ids = self.model.generate(
+        # Requests end at their stop word (or eos_token_id, the engine's end_id) instead of running
+        # to max_new_tokens, which frees their slot and KV cache early
+        if stop_words and self.supports_stop_words:
+            stop_words_list = self.stop_words_list(stop_words)
+            if stop_words_list is not None:
+                kwargs["stop_words_list"] = stop_words_list
+
+        return self.model.generate(
             input_ids,
             decoder_input_ids,
             max_new_tokens,
-            num_beams=self.args.num_beams,
+            num_beams=num_beams,
             bos_token_id=self.tokenizer.bos_token_id,
             pad_token_id=self.tokenizer.pad_token_id,
             eos_token_id=self.tokenizer.eos_token_id,
@@ -176,28 +317,40 @@ class DolphinRunner(MultimodalModelRunner):
             prompt_embedding_table=ptuning_args[0],
             prompt_tasks=ptuning_args[1],
             prompt_vocab_size=ptuning_args[2],
+            **kwargs,
         )
-        profiler.stop("LLM")
 
-        if mpi_rank() == 0:
-            # Extract a list of tensors of shape beam_width x output_ids.
-            output_beams_list = [
-                self.tokenizer.batch_decode(
-                    output_ids[batch_idx, :, decoder_input_ids.shape[1]:],
-                    skip_special_tokens=False) for batch_idx in range(
-                    min(self.args.batch_size, decoder_input_ids.shape[0]))
-            ]
+    def decode_outputs(self, output_ids, prompt_length, batch_size, budgets, num_beams, stop_words):
+        # Tokens generated for each request (first beam), exported as metrics by the server
+        special_ids = torch.tensor([self.tokenizer.pad_token_id, self.tokenizer.eos_token_id],
+                                   device=output_ids.device)
+        self.num_generated_tokens = [
+            int((~torch.isin(output_ids[batch_idx, 0, prompt_length:prompt_length + budgets[batch_idx]],
+                             special_ids)).sum())
+            for batch_idx in range(batch_size)
+        ]
 
-            stripped_text = [[
-                output_beams_list[batch_idx][beam_idx].replace("</s>", "").replace("<pad>", "").strip()
-                for beam_idx in range(self.args.num_beams)
-            ] for batch_idx in range(
-                min(self.args.batch_size, decoder_input_ids.shape[0]))]
-            profiler.stop("Generate")
-            return stripped_text
-        else:
-            profiler.stop("Generate")
-            return None
+        # Extract a list of tensors of shape beam_width x output_ids.
+        output_beams_list = [
+            self.tokenizer.batch_decode(
+                output_ids[batch_idx, :, prompt_length:prompt_length + budgets[batch_idx]],
+                skip_special_tokens=False) for batch_idx in range(batch_size)
+        ]
+
+        return [[
+            self.truncate_at_stop_words(
+                output_beams_list[batch_idx][beam_idx].replace("</s>", "").replace("<pad>", "").strip(),
+                stop_words[batch_idx])
+            for beam_idx in range(num_beams)
+        ] for batch_idx in range(batch_size)]
+
+    @staticmethod
+    def truncate_at_stop_words(text, stop_words):
+        for stop_word in stop_words:
+            index = text.find(stop_word)
+            if index != -1:
+                text = text[:index]
+        return text.strip()
 
 
 if __name__ == "__main__":
@@ -11,11 +11,18 @@ For production use, we recommend `vllm serve` and the OpenAI client API.
 
 import argparse
 import base64
+import contextlib
 import json
+import os
+import sys
 from argparse import Namespace
 from collections.abc import Iterable
 
-import requests
+import httpx
+
+# The client pool is shared by the vllm and tensorrt_llm clients
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client_pool import ClientPool  # noqa: E402
 
 
 def clear_line(n: int = 1) -> None:
@@ -35,10 +42,17 @@ def encode_image_base64(image_path: str) -> str:
     return result
 
 
-def post_http_request(
-        prompt: str, image_path: str, api_url: str, stream: bool = False
-) -> requests.Response:
+def send(pool: ClientPool, path: str, pload: dict, stream: bool) -> contextlib.AbstractContextManager[httpx.Response]:
+    """POST through the pool; the response must be used inside the returned context."""
     headers = {"User-Agent": "Test Client"}
+    if stream:
+        return pool.stream("POST", path, headers=headers, json=pload)
+    return contextlib.nullcontext(pool.post(path, headers=headers, json=pload))
+
+
+def post_http_request(
+        prompt: str, image_path: str, pool: ClientPool, stream: bool = False
+) -> contextlib.AbstractContextManager[httpx.Response]:
     pload = {
         "encoder_prompt": "",
         "decoder_prompt": prompt,
@@ -47,21 +61,43 @@ def post_http_request(
         "max_tokens": 2048,
         "stream": stream,
     }
-    response = requests.post(api_url, headers=headers, json=pload, stream=stream)
-    return response
+    return send(pool, "/generate", pload, stream)
+
+
+def post_batch_http_request(
+        prompt: str, image_paths: list[str], pool: ClientPool, stream: bool = False
+) -> contextlib.AbstractContextManager[httpx.Response]:
+    pload = {
+        "requests": [
+            {
+                "encoder_prompt": "",
+                "decoder_prompt": prompt,
+                "image_base64": encode_image_base64(image_path),
+            }
+            for image_path in image_paths
+        ],
+        "temperature": 0.0,
+        "max_tokens": 2048,
+        "stream": stream,
+    }
+    return send(pool, "/generate_batch", pload, stream)
 
 
-def get_streaming_response(response: requests.Response) -> Iterable[list[str]]:
-    for chunk in response.iter_lines(
-            chunk_size=8192, decode_unicode=False, delimiter=b"\n"
-    ):
+def get_streaming_response(response: httpx.Response) -> Iterable[list[str]]:
+    for chunk in response.iter_lines():
         if chunk:
-            data = json.loads(chunk.decode("utf-8"))
+            data = json.loads(chunk)
             output = data["text"]
             yield output
 
 
-def get_response(response: requests.Response) -> list[str]:
+def get_streaming_batch_response(response: httpx.Response) -> Iterable[dict]:
+    for chunk in response.iter_lines():
+        if chunk:
+            yield json.loads(chunk)
+
+
+def get_response(response: httpx.Response) -> list[str]:
     data = json.loads(response.content)
     output = data["text"]
     return output
@@ -71,32 +107,45 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", type=str, default="localhost")
     parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--urls", type=str, nargs="+", default=None,
+                        help="Base URLs of several server replicas to balance over (default: http://host:port)")
     parser.add_argument("--prompt", type=str, default="Parse the reading order of this document.")
-    parser.add_argument("--image_path", type=str, default="./demo/page_imgs/page_1.jpeg")
+    parser.add_argument("--image_path", type=str, nargs="+", default=["./demo/page_imgs/page_1.jpeg"],
+                        help="One or more images; several images are sent to /generate_batch")
     parser.add_argument("--stream", action="store_true")
     return parser.parse_args()
 
 
 def main(args: Namespace):
     prompt = args.prompt
-    image_path = args.image_path
-    api_url = f"http://{args.host}:{args.port}/generate"
+    image_paths = args.image_path
     stream = args.stream
 
     print(f"Prompt: {prompt!r}\n", flush=True)
-    response = post_http_request(prompt, image_path, api_url, stream)
-
-    if stream:
-        num_printed_lines = 0
-        for h in get_streaming_response(response):
-            clear_line(num_printed_lines)
-            num_printed_lines = 0
-            for i, line in enumerate(h):
-                num_printed_lines += 1
-                print(f"Response {i}: {line!r}", flush=True)
-    else:
-        output = get_response(response)
-        print(f"Response: {output[0]!r}", flush=True)
+    with ClientPool(args.urls or [f"http://{args.host}:{args.port}"]) as pool:
+        if len(image_paths) > 1:
+            with post_batch_http_request(prompt, image_paths, pool, stream) as response:
+                if stream:
+                    for data in get_streaming_batch_response(response):
+                        print(f"Response {data['index']} ({image_paths[data['index']]}): {data['text'][0]!r}",
+                              flush=True)
+                else:
+                    for image_path, output in zip(image_paths, get_response(response)):
+                        print(f"Response ({image_path}): {output[0]!r}", flush=True)
+            return
+
+        with post_http_request(prompt, image_paths[0], pool, stream) as response:
+            if stream:
+                num_printed_lines = 0
+                for h in get_streaming_response(response):
+                    clear_line(num_printed_lines)
+                    num_printed_lines = 0
+                    for i, line in enumerate(h):
+                        num_printed_lines += 1
+                        print(f"Response {i}: {line!r}", flush=True)
+            else:
+                output = get_response(response)
+                print(f"Response: {output[0]!r}", flush=True)
 
 
 if __name__ == "__main__":
@@ -8,16 +8,17 @@ change `vllm/entrypoints/openai/api_server.py` instead.
 """
 
 import asyncio
-import base64
 import json
-import io
+import os
 import ssl
+import sys
+import time
 from argparse import Namespace
 from collections.abc import AsyncGenerator
 from PIL import Image
 from typing import Any, Optional
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from vllm.engine.arg_utils import AsyncEngineArgs
@@ -31,11 +32,25 @@ from vllm.usage.usage_lib import UsageContext
 from vllm.utils import FlexibleArgumentParser, random_uuid, set_ulimit
 from vllm.version import __version__ as VLLM_VERSION
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_decode import ImageDecoder, check_image_shape, parse_image_shape  # noqa: E402
+from metrics import CONTENT_TYPE, InferenceMetrics  # noqa: E402
+
 logger = init_logger("api_server")
 
 TIMEOUT_KEEP_ALIVE = 5  # seconds.
 app = FastAPI()
 engine = None
+metrics = InferenceMetrics()
+# Image decoding is CPU bound, keep it off the event loop
+image_decoder = ImageDecoder(metrics.image_decode)
+
+
+@app.middleware("http")
+async def record_arrival_time(request: Request, call_next):
+    # Latencies are measured from here, so they include reading and decoding the images
+    request.state.arrival_time = time.perf_counter()
+    return await call_next(request)
 
 
 @app.get("/health")
@@ -44,6 +59,12 @@ async def health() -> Response:
     return Response(status_code=200)
 
 
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """Prometheus metrics."""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
 @app.post("/generate")
 async def generate(request: Request) -> Response:
     """Generate completion for the request.
@@ -57,17 +78,89 @@ async def generate(request: Request) -> Response:
     return await _generate(request_dict, raw_request=request)
 
 
-async def decode_image(image_base64: str) -> Image.Image:
-    image_data = base64.b64decode(image_base64)
-    image = Image.open(io.BytesIO(image_data))
-    return image
+@app.post("/generate_batch")
+async def generate_batch(request: Request) -> Response:
+    """Generate completions for a batch of (prompt, image) pairs.
+
+    All pairs are submitted to the engine at once, so they are scheduled
+    together instead of costing one HTTP round trip each.
+
+    The request should be a JSON object with the following fields:
+    - requests: a list of objects with `decoder_prompt`, `image_base64` and
+      optionally `encoder_prompt`.
+    - stream: whether to stream each result back as soon as it finishes.
+    - other fields: the sampling parameters shared by all pairs.
+
+    The response holds the generated texts (without the prompt) in request
+    order. When streaming, one JSON line `{"index": i, "text": [...]}` is
+    sent per pair in completion order.
+    """
+    request_dict = await request.json()
+    return await _generate_batch(request_dict, raw_request=request)
+
+
+@app.post("/generate_raw")
+async def generate_raw(request: Request) -> Response:
+    """Generate completion for an image sent as the raw request body.
+
+    Same as `/generate` without the base64 overhead:
+    - body: the encoded image file (PNG, JPEG, ...), or raw uint8 pixels in
+      HWC order when the `X-Image-Shape: height,width,channels` header is set.
+    - `X-Generate-Params` header: JSON object with the other `/generate` fields.
+    """
+    request_dict = parse_generate_params(request)
+    image_shape = parse_image_shape(request.headers.get("x-image-shape"))
+    image = await image_decoder.decode_bytes(await request.body(), image_shape)
+    return await _generate(request_dict, raw_request=request, image=image)
+
+
+@app.post("/generate_batch_raw")
+async def generate_batch_raw(request: Request) -> Response:
+    """Generate completions for a batch of images sent as the raw request body.
+
+    Same as `/generate_batch` without the base64 overhead:
+    - body: the images of all pairs, back to back.
+    - `X-Generate-Params` header: JSON object with the `/generate_batch`
+      fields, where each entry of `requests` replaces `image_base64` by
+      either `image_shape` ([height, width, channels] of raw uint8 pixels)
+      or `image_length` (byte size of an encoded image file).
+    """
+    request_dict = parse_generate_params(request)
+    body = await request.body()
+
+    chunks = []
+    offset = 0
+    for item in request_dict.get("requests", []):
+        image_shape = item.pop("image_shape", None)
+        if image_shape is not None:
+            image_shape = check_image_shape(image_shape)
+            length = image_shape[0] * image_shape[1] * image_shape[2]
+        else:
+            length = item.pop("image_length", len(body) - offset)
+            if not isinstance(length, int) or isinstance(length, bool) or length < 0:
+                raise HTTPException(status_code=400, detail=f"Invalid image length: {length!r}")
+        chunks.append((body[offset:offset + length], image_shape))
+        offset += length
+    if offset != len(body):
+        raise HTTPException(status_code=400, detail="Image sizes do not match the request body")
+
+    images = await asyncio.gather(*[
+        image_decoder.decode_bytes(image_data, image_shape) for image_data, image_shape in chunks
+    ])
+    return await _generate_batch(request_dict, raw_request=request, images=images)
+
+
+def parse_generate_params(request: Request) -> dict:
+    try:
+        return json.loads(request.headers.get("x-generate-params", "{}"))
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid X-Generate-Params header")
 
 
 async def custom_process_prompt(encoder_prompt: str, decoder_prompt: str,
-                                image_base64: str) -> ExplicitEncoderDecoderPrompt:
+                                image: Image.Image) -> ExplicitEncoderDecoderPrompt:
     assert engine is not None
     tokenizer = engine.engine.get_tokenizer_group().tokenizer
-    image = await decode_image(image_base64)
 
     if encoder_prompt == "":
         encoder_prompt = "0" * 783  # For Dolphin
@@ -86,8 +179,35 @@ async def custom_process_prompt(encoder_prompt: str, decoder_prompt: str,
     return enc_dec_prompt
 
 
+def engine_queue_depth() -> int:
+    # Requests waiting in the engine schedulers, not yet running
+    schedulers = getattr(getattr(engine, "engine", None), "scheduler", [])
+    return sum(len(scheduler.waiting) for scheduler in schedulers)
+
+
+async def track_generation(results_generator: AsyncGenerator, prompt: str,
+                           arrival_time: float) -> AsyncGenerator:
+    """Pass the engine outputs through, recording the request metrics."""
+    metrics.requests_in_flight.inc()
+    time_to_first_token = None
+    final_output = None
+    try:
+        async for request_output in results_generator:
+            if time_to_first_token is None and any(output.token_ids for output in request_output.outputs):
+                time_to_first_token = time.perf_counter() - arrival_time
+            final_output = request_output
+            yield request_output
+    finally:
+        metrics.requests_in_flight.dec()
+
+    if final_output is not None:
+        num_tokens = sum(len(output.token_ids) for output in final_output.outputs)
+        metrics.observe_request(prompt, time.perf_counter() - arrival_time, num_tokens, time_to_first_token)
+
+
 @with_cancellation
-async def _generate(request_dict: dict, raw_request: Request) -> Response:
+async def _generate(request_dict: dict, raw_request: Request,
+                    image: Optional[Image.Image] = None) -> Response:
     encoder_prompt = request_dict.pop("encoder_prompt", "")
     decoder_prompt = request_dict.pop("decoder_prompt", "")
     image_base64 = request_dict.pop("image_base64", "")
@@ -97,8 +217,12 @@ async def _generate(request_dict: dict, raw_request: Request) -> Response:
 
     assert engine is not None
 
-    enc_dec_prompt = await custom_process_prompt(encoder_prompt, decoder_prompt, image_base64)
-    results_generator = engine.generate(enc_dec_prompt, sampling_params, request_id)
+    if image is None:
+        image = await image_decoder.decode_base64(image_base64)
+    enc_dec_prompt = await custom_process_prompt(encoder_prompt, decoder_prompt, image)
+    metrics.batch_size.observe(1)
+    results_generator = track_generation(engine.generate(enc_dec_prompt, sampling_params, request_id),
+                                         decoder_prompt, raw_request.state.arrival_time)
 
     # Streaming case
     async def stream_results() -> AsyncGenerator[bytes, None]:
@@ -130,6 +254,70 @@ async def _generate(request_dict: dict, raw_request: Request) -> Response:
     return JSONResponse(ret)
 
 
+@with_cancellation
+async def _generate_batch(request_dict: dict, raw_request: Request,
+                          images: Optional[list[Image.Image]] = None) -> Response:
+    items = request_dict.pop("requests", [])
+    stream = request_dict.pop("stream", False)
+    sampling_params = SamplingParams(**request_dict)
+
+    assert engine is not None
+
+    if images is None:
+        images = await asyncio.gather(*[
+            image_decoder.decode_base64(item.get("image_base64", "")) for item in items
+        ])
+    enc_dec_prompts = await asyncio.gather(*[
+        custom_process_prompt(item.get("encoder_prompt", ""),
+                              item.get("decoder_prompt", ""),
+                              image)
+        for item, image in zip(items, images)
+    ])
+
+    async def generate_one(index: int, enc_dec_prompt: ExplicitEncoderDecoderPrompt) -> tuple[int, list[str]]:
+        final_output = None
+        results_generator = track_generation(engine.generate(enc_dec_prompt, sampling_params, random_uuid()),
+                                             items[index].get("decoder_prompt", ""), raw_request.state.arrival_time)
+        async for request_output in results_generator:
+            final_output = request_output
+        assert final_output is not None
+        return index, [output.text.strip() for output in final_output.outputs]
+
+    metrics.batch_size.observe(len(items))
+    tasks = [
+        asyncio.create_task(generate_one(index, enc_dec_prompt))
+        for index, enc_dec_prompt in enumerate(enc_dec_prompts)
+    ]
+
+    # Streaming case
+    async def stream_results() -> AsyncGenerator[bytes, None]:
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                index, text_outputs = await next_result
+                ret = {"index": index, "text": text_outputs}
+                yield (json.dumps(ret) + "\n").encode("utf-8")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    if stream:
+        return StreamingResponse(stream_results())
+
+    # Non-streaming case
+    try:
+        results = await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        return Response(status_code=499)
+    finally:
+        # One failed (or cancelled) request fails the batch, stop decoding the others
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    ret = {"text": [text_outputs for _, text_outputs in results]}
+    return JSONResponse(ret)
+
+
 def build_app(args: Namespace) -> FastAPI:
     global app
 
@@ -150,6 +338,7 @@ async def init_app(
               if llm_engine is not None else AsyncLLMEngine.from_engine_args(
         engine_args, usage_context=UsageContext.API_SERVER))
     app.state.engine_client = engine
+    metrics.queue_depth.set_function(engine_queue_depth)
     return app
 
 
@@ -0,0 +1,212 @@
+"""
+Compact columnar storage of recognition results.
+
+One `.npz` file per document, holding one array per element field instead of
+pretty-printed JSON:
+
+    page            int32   (n,)     page number of each element
+    bbox            int32   (n, 4)   x1, y1, x2, y2 in original image pixels
+    reading_order   int32   (n,)
+    label           uint8   (n,)     index into `labels` (uint16 past 256 labels)
+    labels          str     (k,)     label table
+    text_offsets    int64   (n + 1,) byte offsets of each element in `text`
+    text            uint8   (m,)     UTF-8 text of all elements, concatenated
+    extras          uint8            JSON of the less common keys (e.g. figure_path)
+    meta            uint8            JSON of source_file, total_pages, is_pdf
+
+`load_compact` reads it back without parsing any JSON for the element
+columns, and `render_outputs` generates the usual JSON and Markdown on demand:
+
+    python -m utils.compact results/compact/exam.npz --save_dir results
+"""
+
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+COMPACT_EXTENSION = ".npz"
+COLUMN_KEYS = {"label", "bbox", "text", "reading_order"}
+
+
+def _json_bytes(value):
+    return np.frombuffer(json.dumps(value, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+
+def save_compact(path, pages, source_file, is_pdf, compress=True):
+    """Save the recognition results of a document
+
+    Args:
+        path: Output .npz file
+        pages: List of {"page_number", "elements"} (a single page for images)
+        source_file: Path of the parsed document
+        is_pdf: Whether the results come from a PDF (restores the combined JSON layout)
+        compress: zlib-compress the arrays. About 6x smaller on exam pages, for a
+            write time still below the one of the pretty JSON alone
+
+    Returns:
+        str: path
+    """
+    labels = []
+    label_index = {}
+    page_numbers, bboxes, reading_orders, label_ids, text_offsets = [], [], [], [], [0]
+    text_chunks = []
+    extras = {}
+
+    for page in pages:
+        for element in page["elements"]:
+            label = element.get("label", "")
+            if label not in label_index:
+                label_index[label] = len(labels)
+                labels.append(label)
+            encoded = element.get("text", "").encode("utf-8")
+
+            extra = {key: value for key, value in element.items() if key not in COLUMN_KEYS}
+            if extra:
+                extras[len(page_numbers)] = extra
+            page_numbers.append(page["page_number"])
+            bboxes.append(element.get("bbox", [0, 0, 0, 0]))
+            reading_orders.append(element.get("reading_order", 0))
+            label_ids.append(label_index[label])
+            text_chunks.append(encoded)
+            text_offsets.append(text_offsets[-1] + len(encoded))
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "source_file": source_file,
+        "total_pages": len(pages),
+        "page_numbers": [page["page_number"] for page in pages],
+        "is_pdf": is_pdf,
+    }
+    arrays = {
+        "page": np.asarray(page_numbers, dtype=np.int32),
+        "bbox": np.asarray(bboxes, dtype=np.int32).reshape(-1, 4),
+        "reading_order": np.asarray(reading_orders, dtype=np.int32),
+        "label": np.asarray(label_ids, dtype=np.uint8 if len(labels) <= 256 else np.uint16),
+        "labels": np.asarray(labels, dtype=str),
+        "text_offsets": np.asarray(text_offsets, dtype=np.int64),
+        "text": np.frombuffer(b"".join(text_chunks), dtype=np.uint8),
+        "extras": _json_bytes({str(index): extra for index, extra in extras.items()}),
+        "meta": _json_bytes(meta),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # np.savez appends .npz to names without it, write to an open file to keep `path` as is
+    with open(path, "wb") as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+    return path
+
+
+class CompactResult:
+    """Recognition results loaded from a compact file, columns are numpy arrays"""
+
+    def __init__(self, arrays):
+        self.page = arrays["page"]
+        self.bbox = arrays["bbox"]
+        self.reading_order = arrays["reading_order"]
+        self.label = arrays["label"]
+        self.labels = [str(label) for label in arrays["labels"]]
+        self.text_offsets = arrays["text_offsets"]
+        self._text = arrays["text"].tobytes()
+        self._extras_json = arrays["extras"].tobytes()
+        self._extras = None
+        self.meta = json.loads(arrays["meta"].tobytes())
+
+    def __len__(self):
+        return len(self.page)
+
+    @property
+    def extras(self):
+        # Parsed on first use, the text and geometry do not need it
+        if self._extras is None:
+            self._extras = {int(index): extra for index, extra in json.loads(self._extras_json).items()}
+        return self._extras
+
+    def text(self, index):
+        return self._text[self.text_offsets[index]:self.text_offsets[index + 1]].decode("utf-8")
+
+    def texts(self):
+        """Text of every element, in storage order"""
+        offsets = self.text_offsets.tolist()
+        blob = self._text
+        return [blob[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def full_text(self, separator="\n"):
+        """Text of all elements, each followed by `separator`, what the grader consumes"""
+        if not len(self):
+            return ""
+        # Join the UTF-8 slices and decode once, rather than decoding every element
+        offsets = self.text_offsets.tolist()
+        blob = self._text
+        encoded_separator = separator.encode("utf-8")
+        chunks = [blob[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        return (encoded_separator.join(chunks) + encoded_separator).decode("utf-8")
+
+    def element(self, index):
+        element = {
+            "label": self.labels[self.label[index]],
+            "bbox": self.bbox[index].tolist(),
+            "text": self.text(index),
+            "reading_order": int(self.reading_order[index]),
+        }
+        element.update(self.extras.get(index, {}))
+        return element
+
+    def pages(self):
+        """Rebuild the [{"page_number", "elements"}] structure of the pipeline"""
+        elements_by_page = {page_number: [] for page_number in self.meta["page_numbers"]}
+        for index in range(len(self)):
+            elements_by_page[int(self.page[index])].append(self.element(index))
+        return [{"page_number": number, "elements": elements} for number, elements in elements_by_page.items()]
+
+    def to_results(self):
+        """The results as returned by `process_document`: pages for a PDF, elements for an image"""
+        pages = self.pages()
+        if self.meta["is_pdf"]:
+            return pages
+        return pages[0]["elements"] if pages else []
+
+
+def load_compact(path):
+    """Load a file written by `save_compact`"""
+    with np.load(path, allow_pickle=False) as data:
+        return CompactResult({key: data[key] for key in data.files})
+
+
+def get_compact_path(save_dir, document_path):
+    base_name = os.path.splitext(os.path.basename(document_path))[0]
+    return os.path.join(save_dir, "compact", f"{base_name}{COMPACT_EXTENSION}")
+
+
+def render_outputs(compact_path, save_dir):
+    """Write the pretty JSON and Markdown of a compact file, as the pipeline would have
+
+    Returns:
+        str: Path of the JSON file
+    """
+    from utils.utils import save_combined_pdf_results, save_outputs
+
+    result = load_compact(compact_path)
+    source_file = result.meta["source_file"]
+    if result.meta["is_pdf"]:
+        return save_combined_pdf_results(result.pages(), source_file, save_dir)
+    os.makedirs(os.path.join(save_dir, "recognition_json"), exist_ok=True)
+    os.makedirs(os.path.join(save_dir, "markdown"), exist_ok=True)
+    return save_outputs(result.to_results(), source_file, save_dir)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate JSON and Markdown from compact result files")
+    parser.add_argument("compact_files", nargs="+", help="Compact .npz files")
+    parser.add_argument("--save_dir", required=True, help="Directory to write recognition_json/ and markdown/ to")
+    args = parser.parse_args()
+
+    for compact_path in args.compact_files:
+        print(render_outputs(compact_path, args.save_dir))
+
+
+if __name__ == "__main__":
+    main()
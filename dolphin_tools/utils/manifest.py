@@ -0,0 +1,142 @@
+"""
+Resumable run manifest for batch document parsing.
+
+One JSON object per line is appended for every processed file, so an
+interrupted run loses at most the line being written, and the next run can
+skip the files already done. Entries carry the SHA-256 of the file, so a file
+replaced since is processed again.
+
+`PageCache` keeps the results of every PDF page under the hash of its
+rendered pixels: when a PDF changes, only its new or modified pages go through
+the model again.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Size, modification time and SHA-256 of a file"""
+    stat = os.stat(path)
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256.hexdigest()}
+
+
+def image_sha256(image):
+    """SHA-256 of the pixels of a PIL image"""
+    sha256 = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    sha256.update(image.tobytes())
+    return sha256.hexdigest()
+
+
+class Manifest:
+    """Append-only JSON Lines record of processed documents
+
+    Args:
+        path: Manifest file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    @staticmethod
+    def key(document_path):
+        return os.path.abspath(document_path)
+
+    def load(self):
+        """Read the existing entries, the last entry of a file wins"""
+        self.entries = {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Truncated line of an interrupted run
+                    continue
+                self.entries[entry["file"]] = entry
+
+    def is_done(self, document_path):
+        """Whether the file was processed and has not changed since
+
+        The file is only hashed again when its size or modification time differ
+        from the entry, so checking an unchanged archive stays cheap.
+        """
+        entry = self.entries.get(self.key(document_path))
+        if entry is None or entry.get("status") != "done":
+            return False
+        if "sha256" not in entry:
+            return True
+        stat = os.stat(document_path)
+        if stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        return file_fingerprint(document_path)["sha256"] == entry["sha256"]
+
+    def record(self, document_path, status, **fields):
+        """Append an entry, flushed to disk before returning
+
+        Args:
+            document_path: Processed document
+            status: "done" or "failed"
+            fields: Extra JSON-serializable information (output path, error, timings)
+        """
+        entry = {"file": self.key(document_path), "status": status, "time": time.time(), **fields}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[entry["file"]] = entry
+        return entry
+
+
+class PageCache:
+    """Content-addressed results of PDF pages, one JSON file per page hash
+
+    Args:
+        directory: Cache directory, usually `<save_dir>/pages`
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, page_hash):
+        return os.path.join(self.directory, f"{page_hash}.json")
+
+    def get(self, page_hash, page_name):
+        """Cached recognition results of a page, or None
+
+        Figures are saved under the page name, so results with figures are only
+        reused for a page of the same name.
+        """
+        try:
+            with open(self._path(page_hash), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        has_figures = any("figure_path" in element for element in entry["results"])
+        if has_figures and entry["page_name"] != page_name:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["results"]
+
+    def put(self, page_hash, page_name, results):
+        path = self._path(page_hash)
+        # Several workers may share the cache, write atomically
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"page_name": page_name, "results": results, "time": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -4,22 +4,86 @@ SPDX-License-Identifier: MIT
 """
 
 import re
-import base64
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterator, List, Tuple
+
+TABLE_PATTERN = re.compile(r'<table.*?>.*?</table>', re.DOTALL)
+TABLE_TAG_PATTERN = re.compile(r'<table[^>]*>')
+CHINESE_PATTERN = re.compile('[\u4e00-\u9fff]')
+HEADING_LABELS = frozenset({'sec_0', 'sec_1', 'sec_2', 'sec_3', 'sec_4', 'sec_5'})
+
+
+def is_chinese(char):
+    return '\u4e00' <= char <= '\u9fff'
 
 
 def extract_table_from_html(html_string):
     """Extract and clean table tags from HTML string"""
     try:
-        table_pattern = re.compile(r'<table.*?>.*?</table>', re.DOTALL)
-        tables = table_pattern.findall(html_string)
-        tables = [re.sub(r'<table[^>]*>', '<table>', table) for table in tables]
+        tables = TABLE_PATTERN.findall(html_string)
+        tables = [TABLE_TAG_PATTERN.sub('<table>', table) for table in tables]
         return '\n'.join(tables)
     except Exception as e:
         print(f"extract_table_from_html error: {str(e)}")
         return f"<table><tr><td>Error extracting table: {str(e)}</td></tr></table>"
 
 
+def _sequential_replace(text: str, replacements: Tuple[Tuple[str, str], ...]) -> str:
+    for key, value in replacements:
+        text = text.replace(key, value)
+    return text
+
+
+def _is_single_pass_safe(replacements: Tuple[Tuple[str, str], ...], values: List[str]) -> bool:
+    """Whether one regex pass gives the same result as the sequential replacements
+
+    Holds when every key is a LaTeX command (a backslash, then no other one), so
+    two matches can never overlap, and no key extends past the end of a
+    replacement value into the text that follows it.
+    """
+    keys = [key for key, _ in replacements]
+    if any(not key.startswith('\\') or '\\' in key[1:] for key in keys):
+        return False
+    for value in values:
+        if not value.startswith('\\'):
+            return False
+        for start in [i for i, char in enumerate(value) if char == '\\']:
+            suffix = value[start:]
+            if any(len(key) > len(suffix) and key.startswith(suffix) for key in keys):
+                return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def compile_replacements(replacements: Tuple[Tuple[str, str], ...]) -> Callable[[str], str]:
+    """Compile a sequence of `str.replace` calls into a single regex substitution
+
+    Each value is passed through the replacements that follow its key, so one
+    left-to-right pass gives the result of applying them in order. Keys are
+    tried in sequence order, so the earlier of two keys matching at the same
+    position wins, as it does sequentially. Falls back to the sequential
+    replacements for tables where one pass would differ.
+    """
+    table = {}
+    for index, (key, value) in enumerate(replacements):
+        if key not in table:
+            table[key] = _sequential_replace(value, replacements[index + 1:])
+    if not table:
+        return lambda text: text
+    if not _is_single_pass_safe(replacements, list(table.values())):
+        return lambda text: _sequential_replace(text, replacements)
+
+    pattern = re.compile('|'.join(re.escape(key) for key in table))
+
+    def replace(text: str) -> str:
+        # Every key starts with a backslash, most texts have none
+        if '\\' not in text:
+            return text
+        return pattern.sub(lambda match: table[match.group(0)], text)
+
+    return replace
+
+
 class MarkdownConverter:
     """Convert structured recognition results to Markdown format"""
     
@@ -54,46 +118,48 @@ class MarkdownConverter:
             '\langle': '\langle ',
             '\pm': '\pm '
         }
+        # \upmu -> \mu, then the table above, applied in one pass
+        self._replace_formula = compile_replacements(((r'\upmu', r'\mu'),) + tuple(self.replace_dict.items()))
+
+        # Handlers of the labels other than headings and figures
+        self._handlers = {
+            'tab': self._handle_table,
+            'equ': self._handle_formula,
+            'list': self._handle_list_item,
+            'code': lambda text: f"```bash\n{text}\n```\n\n",
+        }
     
     def try_remove_newline(self, text: str) -> str:
         try:
             # Preprocess text to handle line breaks
             text = text.strip()
             text = text.replace('-\n', '')
-            
-            # Handle Chinese text line breaks
-            def is_chinese(char):
-                return '\u4e00' <= char <= '\u9fff'
+            if '\n' not in text:
+                return text.strip()
 
-            lines = text.split('\n')
+            # Each line is stripped once, then joined with its separator to the next one
+            lines = [line.strip() for line in text.split('\n')]
             processed_lines = []
             
             # Process all lines except the last one
-            for i in range(len(lines)-1):
-                current_line = lines[i].strip()
-                next_line = lines[i+1].strip()
-                
+            for current_line, next_line in zip(lines, lines[1:]):
                 # Always add the current line, but determine if we need a newline
-                if current_line:  # If current line is not empty
-                    if next_line:  # If next line is not empty
-                        # For Chinese text handling
-                        if is_chinese(current_line[-1]) and is_chinese(next_line[0]):
-                            processed_lines.append(current_line)
-                        else:
-                            processed_lines.append(current_line + ' ')
-                    else:
-                        # Next line is empty, add current line with newline
-                        processed_lines.append(current_line + '\n')
-                else:
+                if not current_line:
                     # Current line is empty, add an empty line
                     processed_lines.append('\n')
+                elif not next_line:
+                    # Next line is empty, add current line with newline
+                    processed_lines.append(current_line + '\n')
+                elif is_chinese(current_line[-1]) and is_chinese(next_line[0]):
+                    # For Chinese text handling
+                    processed_lines.append(current_line)
+                else:
+                    processed_lines.append(current_line + ' ')
             
             # Add the last line
-            if lines and lines[-1].strip():
-                processed_lines.append(lines[-1].strip())
+            processed_lines.append(lines[-1])
             
-            text = ''.join(processed_lines)
-            return text
+            return ''.join(processed_lines)
         
         except Exception as e:
             print(f"try_remove_newline error: {str(e)}")
@@ -117,15 +183,10 @@ class MarkdownConverter:
     
     def _process_formulas_in_text(self, text: str) -> str:
         """
-        Process mathematical formulas in text by iteratively finding and replacing formulas.
-        - Identify inline and block formulas
-        - Replace newlines within formulas with \\
+        Normalize the LaTeX commands of the formulas in text, in a single pass
         """
         try:
-            text = text.replace(r'\upmu', r'\mu')
-            for key, value in self.replace_dict.items():
-                text = text.replace(key, value)
-            return text
+            return self._replace_formula(text)
         
         except Exception as e:
             print(f"_process_formulas_in_text error: {str(e)}")
@@ -136,12 +197,8 @@ class MarkdownConverter:
         Remove newline in heading
         """
         try:
-            # Handle Chinese text line breaks
-            def is_chinese(char):
-                return '\u4e00' <= char <= '\u9fff'
-            
             # Check if the text contains Chinese characters
-            if any(is_chinese(char) for char in text):
+            if CHINESE_PATTERN.search(text):
                 return text.replace('\n', '')
             else:
                 return text.replace('\n', ' ')
@@ -225,59 +282,58 @@ class MarkdownConverter:
         Handle formula-specific content
         """
         try:
-            text = text.strip('$').rstrip("\ ").replace(r'\upmu', r'\mu')
-            for key, value in self.replace_dict.items():
-                text = text.replace(key, value)
-            processed_text = '$$' + text + '$$'
-            return f"{processed_text}\n\n"
+            text = self._replace_formula(text.strip('$').rstrip("\\ "))
+            return f"$${text}$$\n\n"
         
         except Exception as e:
             print(f"_handle_formula error: {str(e)}")
             return f"*[Error processing formula: {str(e)}]*\n\n"
 
-    def convert(self, recognition_results: List[Dict[str, Any]]) -> str:
+    def convert(self, recognition_results: List[Dict[str, Any]], start: int = 0) -> str:
         """
         Convert recognition results to markdown format
+
+        Args:
+            start: Index of the first element, see convert_iter
         """
         try:
-            markdown_content = []
-            
-            for section_count, result in enumerate(recognition_results):
-                try:
-                    label = result.get('label', '')
-                    text = result.get('text', '').strip()
-                    
-                    # Skip empty text
-                    if not text:
-                        continue
-                        
-                    # Handle different content types
-                    if label in {'sec_0', 'sec_1', 'sec_2', 'sec_3', 'sec_4', 'sec_5'}:
-                        markdown_content.append(self._handle_heading(text, label))
-                    elif label == 'fig':
-                        markdown_content.append(self._handle_figure(text, section_count))
-                    elif label == 'tab':
-                        markdown_content.append(self._handle_table(text))
-                    elif label == 'equ':
-                        markdown_content.append(self._handle_formula(text))
-                    elif label == 'list':
-                        markdown_content.append(self._handle_list_item(text))
-                    elif label == 'code':
-                        markdown_content.append(f"```bash\n{text}\n```\n\n")
-                    else:
-                        # Handle regular text (paragraphs, etc.)
-                        processed_text = self._handle_text(text)
-                        markdown_content.append(f"{processed_text}\n\n")
-
-                except Exception as e:
-                    print(f"Error processing item {section_count}: {str(e)}")
-                    # Add a placeholder for the failed item
-                    markdown_content.append(f"*[Error processing content]*\n\n")
-            
-            # Join all content and apply post-processing
-            result = ''.join(markdown_content)
-            return result
+            # Join all content
+            return ''.join(self.convert_iter(recognition_results, start))
         
         except Exception as e:
             print(f"convert error: {str(e)}")
             return f"Error generating markdown content: {str(e)}"
+
+    def convert_iter(self, recognition_results, start: int = 0) -> Iterator[str]:
+        """
+        Yield the markdown of each element, as soon as it is converted
+
+        Args:
+            recognition_results: Iterable of recognition results, may be a generator
+            start: Index of the first element, numbers the figures when a
+                document is converted in several calls
+        """
+        for section_count, result in enumerate(recognition_results, start):
+            try:
+                label = result.get('label', '')
+                text = result.get('text', '').strip()
+                
+                # Skip empty text
+                if not text:
+                    continue
+                    
+                # Handle different content types
+                if label in HEADING_LABELS:
+                    yield self._handle_heading(text, label)
+                elif label == 'fig':
+                    yield self._handle_figure(text, section_count)
+                elif label in self._handlers:
+                    yield self._handlers[label](text)
+                else:
+                    # Handle regular text (paragraphs, etc.)
+                    yield f"{self._handle_text(text)}\n\n"
+
+            except Exception as e:
+                print(f"Error processing item {section_count}: {str(e)}")
+                # Add a placeholder for the failed item
+                yield "*[Error processing content]*\n\n"
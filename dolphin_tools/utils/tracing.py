@@ -0,0 +1,159 @@
+"""
+Lightweight tracing for the document parsing pipeline.
+
+`process_document` opens a span around every stage (rasterize, layout, crop,
+element batches, output writes). The default `Tracer` does nothing, so the
+pipeline pays no cost unless a tracer is passed:
+
+    tracer = RecordingTracer()
+    process_document(path, model, save_dir, tracer=tracer)
+    print(tracer.timings())
+
+`CallbackTracer` calls user functions on span start/end, and
+`OpenTelemetryTracer` forwards the spans to OpenTelemetry (optional dependency).
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Span:
+    """A timed pipeline stage"""
+
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional["Span"] = None
+    start_time: float = 0.0
+    end_time: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        end_time = self.end_time if self.end_time is not None else time.perf_counter()
+        return end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+class _NoOpSpan(Span):
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoOpSpan("noop")
+
+
+class Tracer:
+    """No-op tracer, the default of the pipeline"""
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a stage, yields the Span"""
+        return nullcontext(_NOOP_SPAN)
+
+
+NOOP_TRACER = Tracer()
+
+
+class CallbackTracer(Tracer):
+    """Tracer calling `on_start(span)` and `on_end(span)` around every stage
+
+    Spans are nested per thread, `span.parent` is the enclosing stage.
+    """
+
+    def __init__(self, on_start: Optional[Callable[[Span], None]] = None,
+                 on_end: Optional[Callable[[Span], None]] = None):
+        self.on_start = on_start
+        self.on_end = on_end
+        self._local = threading.local()
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        return getattr(self._local, "span", None)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, attributes, parent=self.current_span, start_time=time.perf_counter())
+        self._local.span = span
+        if self.on_start:
+            self.on_start(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.end_time = time.perf_counter()
+            self._local.span = span.parent
+            if self.on_end:
+                self.on_end(span)
+
+
+class RecordingTracer(CallbackTracer):
+    """Tracer keeping every finished span, to report a timing breakdown"""
+
+    def __init__(self, on_start: Optional[Callable[[Span], None]] = None,
+                 on_end: Optional[Callable[[Span], None]] = None):
+        super().__init__(on_start, self._record)
+        self._user_on_end = on_end
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    def _record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+        if self._user_on_end:
+            self._user_on_end(span)
+
+    def timings(self, precision: int = 4) -> Dict[str, Any]:
+        """Total seconds and number of spans per stage name
+
+        Returns:
+            dict: {"total": seconds of the top level spans, "stages": {name: {"seconds", "count"}}}
+        """
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span.name, {"seconds": 0.0, "count": 0})
+            stage["seconds"] += span.duration
+            stage["count"] += 1
+        for stage in stages.values():
+            stage["seconds"] = round(stage["seconds"], precision)
+        total = sum(span.duration for span in spans if span.parent is None)
+        return {"total": round(total, precision), "stages": stages}
+
+
+class OpenTelemetryTracer(Tracer):
+    """Forward the pipeline spans to OpenTelemetry
+
+    Requires `opentelemetry-api`; spans are exported by whatever SDK and
+    exporter the application configured.
+    """
+
+    def __init__(self, otel_tracer=None, name: str = "dolphin"):
+        if otel_tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError("OpenTelemetryTracer requires the opentelemetry-api package") from e
+            otel_tracer = trace.get_tracer(name)
+        self.otel_tracer = otel_tracer
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, attributes, start_time=time.perf_counter())
+        otel_attributes = {key: value for key, value in attributes.items()
+                           if isinstance(value, (str, bool, int, float))}
+        with self.otel_tracer.start_as_current_span(name, attributes=otel_attributes) as otel_span:
+            try:
+                yield span
+            finally:
+                span.end_time = time.perf_counter()
+                for key, value in span.attributes.items():
+                    if key not in otel_attributes and isinstance(value, (str, bool, int, float)):
+                        otel_span.set_attribute(key, value)
@@ -7,6 +7,8 @@ import io
 import json
 import os
 import re
+import threading
+from collections import deque
 from dataclasses import dataclass
 from typing import List, Tuple
 
@@ -18,6 +20,11 @@ from PIL import Image
 from utils.markdown_utils import MarkdownConverter
 
 
+def get_figure_filename(image_name, reading_order):
+    """Filename of a figure saved by `save_figure_to_local`"""
+    return f"{image_name}_figure_{reading_order:03d}.png"
+
+
 def save_figure_to_local(pil_crop, save_dir, image_name, reading_order):
     """Save cropped figure to local file system
 
@@ -36,7 +43,7 @@ def save_figure_to_local(pil_crop, save_dir, image_name, reading_order):
         # os.makedirs(figures_dir, exist_ok=True)
 
         # Generate figure filename
-        figure_filename = f"{image_name}_figure_{reading_order:03d}.png"
+        figure_filename = get_figure_filename(image_name, reading_order)
         figure_path = os.path.join(figures_dir, figure_filename)
 
         # Save the figure
@@ -90,6 +97,120 @@ def convert_pdf_to_images(pdf_path, target_size=896):
         return []
 
 
+class PdfResultStream:
+    """Write the combined JSON and Markdown of a PDF page by page
+
+    Each page is appended to both files as soon as it is written, so memory
+    does not grow with the document and partial results can be read while the
+    PDF is processed. The finished files are identical to the ones of a single
+    `json.dump(..., indent=2)` and `MarkdownConverter.convert` of all pages.
+
+    `add_page` only queues the page; `write_pending` writes the queued pages in
+    order and may run on any thread, e.g. an utils.writer.AsyncOutputWriter.
+
+    Args:
+        pdf_path: Path to original PDF file
+        save_dir: Directory to save results
+        total_pages: Number of pages of the PDF
+    """
+
+    def __init__(self, pdf_path, save_dir, total_pages):
+        # Create output filename based on PDF name
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        self.json_path = os.path.join(save_dir, "recognition_json", f"{base_name}.json")
+        self.markdown_path = os.path.join(save_dir, "markdown", f"{base_name}.md")
+        os.makedirs(os.path.dirname(self.json_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.markdown_path), exist_ok=True)
+
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pages_written = 0
+        # Index of the next Markdown element, figures are numbered across pages
+        self._element_offset = 0
+        self._closed = False
+
+        self._json_file = open(self.json_path, "w", encoding="utf-8")
+        source_file = json.dumps(pdf_path, ensure_ascii=False)
+        self._json_file.write(f'{{\n  "source_file": {source_file},\n  "total_pages": {total_pages},\n  "pages": [')
+        self._json_file.flush()
+
+        self._markdown_converter = MarkdownConverter()
+        self._markdown_file = open(self.markdown_path, "w", encoding="utf-8")
+
+    def add_page(self, page_results):
+        """Queue the {"page_number", "elements"} results of the next page"""
+        with self._pending_lock:
+            self._pending.append(page_results)
+
+    def write_pending(self):
+        """Write the queued pages, in the order they were added"""
+        with self._write_lock:
+            while not self._closed:
+                with self._pending_lock:
+                    if not self._pending:
+                        return
+                    page_results = self._pending.popleft()
+                self._write_page(page_results)
+
+    def _write_page(self, page_results):
+        page_json = json.dumps(page_results, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+        separator = ",\n    " if self._pages_written else "\n    "
+        self._json_file.write(separator + page_json)
+        self._json_file.flush()
+        self._pages_written += 1
+
+        if self._markdown_file is None:
+            return
+        try:
+            page_elements = page_results.get("elements", [])
+            if not page_elements:
+                return
+            # Add page separator if not the first page
+            if self._element_offset:
+                page_elements = [
+                    {"label": "page_separator", "text": f"\n\n---\n\n", "reading_order": self._element_offset}
+                ] + page_elements
+            self._markdown_file.write(self._markdown_converter.convert(page_elements, start=self._element_offset))
+            self._markdown_file.flush()
+            self._element_offset += len(page_elements)
+        except Exception as e:
+            print(f"Error generating markdown: {e}")
+            self._markdown_file.close()
+            self._markdown_file = None
+
+    def close(self):
+        """Write the remaining pages and finish both files
+
+        Returns:
+            Path to saved combined JSON file
+        """
+        self.write_pending()
+        with self._write_lock:
+            if not self._closed:
+                self._json_file.write("\n  ]\n}" if self._pages_written else "]\n}")
+                self._json_file.close()
+                if self._markdown_file is not None:
+                    self._markdown_file.close()
+                self._closed = True
+        return self.json_path
+
+    def abort(self):
+        """Close both files as they are, after a failure, pages still queued are dropped
+
+        The JSON is left without its closing brackets, so it cannot be mistaken
+        for the results of the whole document.
+        """
+        with self._write_lock:
+            if not self._closed:
+                self._json_file.close()
+                if self._markdown_file is not None:
+                    self._markdown_file.close()
+                self._closed = True
+        with self._pending_lock:
+            self._pending.clear()
+
+
 def save_combined_pdf_results(all_page_results, pdf_path, save_dir):
     """Save combined results for multi-page PDF with both JSON and Markdown
 
@@ -101,56 +222,10 @@ def save_combined_pdf_results(all_page_results, pdf_path, save_dir):
     Returns:
         Path to saved combined JSON file
     """
-    # Create output filename based on PDF name
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-
-    # Prepare combined results
-    combined_results = {"source_file": pdf_path, "total_pages": len(all_page_results), "pages": all_page_results}
-
-    # Save combined JSON results
-    json_filename = f"{base_name}.json"
-    json_path = os.path.join(save_dir, "recognition_json", json_filename)
-    os.makedirs(os.path.dirname(json_path), exist_ok=True)
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(combined_results, f, indent=2, ensure_ascii=False)
-
-    # Generate and save combined markdown
-    try:
-        markdown_converter = MarkdownConverter()
-
-        # Combine all page results into a single list for markdown conversion
-        all_elements = []
-        for page_data in all_page_results:
-            page_elements = page_data.get("elements", [])
-            if page_elements:
-                # Add page separator if not the first page
-                if all_elements:
-                    all_elements.append(
-                        {"label": "page_separator", "text": f"\n\n---\n\n", "reading_order": len(all_elements)}
-                    )
-                all_elements.extend(page_elements)
-
-        # Generate markdown content
-        markdown_content = markdown_converter.convert(all_elements)
-
-        # Save markdown file
-        markdown_filename = f"{base_name}.md"
-        markdown_path = os.path.join(save_dir, "markdown", markdown_filename)
-        os.makedirs(os.path.dirname(markdown_path), exist_ok=True)
-
-        with open(markdown_path, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-
-        # print(f"Combined markdown saved to: {markdown_path}")
-
-    except ImportError:
-        print("MarkdownConverter not available, skipping markdown generation")
-    except Exception as e:
-        print(f"Error generating markdown: {e}")
-
-    # print(f"Combined JSON results saved to: {json_path}")
-    return json_path
+    stream = PdfResultStream(pdf_path, save_dir, len(all_page_results))
+    for page_results in all_page_results:
+        stream.add_page(page_results)
+    return stream.close()
 
 
 def parse_layout_string(bbox_str):
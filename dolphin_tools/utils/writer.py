@@ -0,0 +1,121 @@
+"""
+Output writers for the document parsing pipeline.
+
+The pipeline hands every output write (figure PNGs, JSON, Markdown) to a
+writer instead of doing it inline. `OutputWriter` runs the write immediately,
+as before. `AsyncOutputWriter` runs it on background threads, so PNG encoding
+and disk I/O overlap with inference:
+
+    writer = AsyncOutputWriter(max_workers=2, max_pending=64)
+    process_document(path, model, save_dir, writer=writer)  # flushes at document end
+    writer.close()
+
+PIL's PNG encoder and file writes release the GIL, so the writes really run
+in parallel with the model.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class OutputWriter:
+    """Synchronous writer, the default of the pipeline
+
+    A failed write is raised by the next `flush`, as with `AsyncOutputWriter`.
+    Writes run in the submitting thread, so failures are kept per thread: the
+    shared `SYNC_WRITER` does not raise one thread's errors in another.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _failures(self):
+        if not hasattr(self._local, "failures"):
+            self._local.failures = []
+        return self._local.failures
+
+    def submit(self, function, *args, **kwargs):
+        """Run `function(*args, **kwargs)`, returns a Future of its result"""
+        future = Future()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+            self._failures().append(e)
+        return future
+
+    def flush(self):
+        """Wait for the submitted writes, raises the first error of a failed write"""
+        failures, self._local.failures = self._failures(), []
+        if failures:
+            raise failures[0]
+
+    def discard(self):
+        """Drop the submitted writes and their errors, e.g. those of a document that failed"""
+        self._local.failures = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+SYNC_WRITER = OutputWriter()
+
+
+class AsyncOutputWriter(OutputWriter):
+    """Writer running the writes on a thread pool
+
+    Args:
+        max_workers: Writer threads
+        max_pending: Writes queued or running before `submit` blocks. This
+            backpressure bounds the memory held by pending figures when the
+            disk is slower than inference.
+    """
+
+    def __init__(self, max_workers=2, max_pending=64):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="output-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def submit(self, function, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        self._slots.release()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        wait(pending)
+        for future in pending:
+            if future.exception() is not None:
+                raise future.exception()
+
+    def discard(self):
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        # Writes not started yet are cancelled, the running ones finish before the next document
+        for future in pending:
+            future.cancel()
+        wait(pending)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
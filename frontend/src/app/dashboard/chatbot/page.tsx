@@ -22,7 +22,7 @@ import {
   Eye,
   RefreshCw
 } from 'lucide-react';
-import { Exam, Copy } from '@/lib/api';
+import { Exam, CopySummary } from '@/lib/api';
 import { examsAPI, copiesAPI, chatbotAPI } from '@/lib/api';
 import { useAuthStore } from '@/store/auth';
 import { toast } from 'sonner';
@@ -57,7 +57,7 @@ interface FlaggedIssue {
 export default function ChatbotPage() {
   const [exams, setExams] = useState<Exam[]>([]);
   const [selectedExamId, setSelectedExamId] = useState<string>('');
-  const [copies, setCopies] = useState<Copy[]>([]);
+  const [copies, setCopies] = useState<CopySummary[]>([]);
   const [selectedCopyId, setSelectedCopyId] = useState<string>('');
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [currentMessage, setCurrentMessage] = useState('');
@@ -25,7 +25,7 @@ import {
   BookOpen,
   MessageSquare
 } from 'lucide-react';
-import { Copy, copiesAPI } from '@/lib/api';
+import { Copy, ExtractedElement, copiesAPI } from '@/lib/api';
 import api from '@/lib/api';
 import { useAuthStore } from '@/store/auth';
 import { toast } from 'sonner';
@@ -52,6 +52,7 @@ export default function CopyViewerPage() {
   const copyId = params.id as string;
   
   const [copy, setCopy] = useState<Copy | null>(null);
+  const [elements, setElements] = useState<ExtractedElement[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [showTools, setShowTools] = useState(true);
   const [selectedText, setSelectedText] = useState('');
@@ -74,6 +75,11 @@ export default function CopyViewerPage() {
       setIsLoading(true);
       const copyData = await copiesAPI.getCopy(copyId);
       setCopy(copyData);
+
+      // Text extracted by the correction, empty until the copy is corrected
+      copiesAPI.getCopyElements(copyData.exam_id, copyId)
+        .then(setElements)
+        .catch((error) => console.error('Error fetching extracted text:', error));
       
       // Initialize welcome message
       setMessages([{
@@ -339,7 +345,7 @@ export default function CopyViewerPage() {
               {/* Quick Actions Tabs */}
               <div className="p-4 border-b">
                 <Tabs value={activeTab} onValueChange={setActiveTab} className="w-full">
-                  <TabsList className="grid w-full grid-cols-3">
+                  <TabsList className="grid w-full grid-cols-4">
                     <TabsTrigger value="highlight" className="text-xs">
                       <Highlighter className="h-3 w-3 mr-1" />
                       Surligner
@@ -348,6 +354,10 @@ export default function CopyViewerPage() {
                       <AtSign className="h-3 w-3 mr-1" />
                       Contexte
                     </TabsTrigger>
+                    <TabsTrigger value="text" className="text-xs">
+                      <FileText className="h-3 w-3 mr-1" />
+                      Texte
+                    </TabsTrigger>
                     <TabsTrigger value="additional" className="text-xs">
                       <Plus className="h-3 w-3 mr-1" />
                       Plus
@@ -392,6 +402,27 @@ export default function CopyViewerPage() {
                       </Card>
                     </TabsContent>
 
+                    <TabsContent value="text" className="m-0">
+                      <Card className="p-3 bg-muted/30">
+                        {elements.length === 0 ? (
+                          <p className="text-xs text-muted-foreground">
+                            Aucun texte extrait pour cette copie
+                          </p>
+                        ) : (
+                          <div className="space-y-2 max-h-64 overflow-y-auto">
+                            {elements.map((element) => (
+                              <div key={`${element.page}-${element.reading_order}`} className="text-xs">
+                                <span className="text-muted-foreground">
+                                  p.{element.page} · {element.label}
+                                </span>
+                                <p className="whitespace-pre-wrap">{element.text}</p>
+                              </div>
+                            ))}
+                          </div>
+                        )}
+                      </Card>
+                    </TabsContent>
+
                     <TabsContent value="additional" className="m-0">
                       <Card className="p-3 bg-muted/30">
                         <div className="space-y-1">
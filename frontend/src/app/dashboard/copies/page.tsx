@@ -32,7 +32,7 @@ import {
   Play,
   RefreshCw
 } from 'lucide-react';
-import { Exam, Copy } from '@/lib/api';
+import { Exam, CopySummary } from '@/lib/api';
 import { examsAPI, copiesAPI, correctionAPI } from '@/lib/api';
 import { useAuthStore } from '@/store/auth';
 import { toast } from 'sonner';
@@ -45,8 +45,8 @@ export default function ExamCopiesPage() {
   const examId = params.id as string;
   
   const [exam, setExam] = useState<Exam | null>(null);
-  const [copies, setCopies] = useState<Copy[]>([]);
-  const [filteredCopies, setFilteredCopies] = useState<Copy[]>([]);
+  const [copies, setCopies] = useState<CopySummary[]>([]);
+  const [filteredCopies, setFilteredCopies] = useState<CopySummary[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [isUploading, setIsUploading] = useState(false);
   const [isCorrecting, setIsCorrecting] = useState(false);
@@ -437,7 +437,7 @@ export default function ExamCopiesPage() {
 }
 
 interface CopiesListProps {
-  copies: Copy[];
+  copies: CopySummary[];
   examId: string;
   canManageCopies: boolean;
   onCorrectCopy: (copyId: string) => void;
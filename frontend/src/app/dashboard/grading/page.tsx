@@ -21,7 +21,7 @@ import {
   BarChart3,
   TrendingUp
 } from 'lucide-react';
-import { Exam, Copy, CorrectionResult } from '@/lib/api';
+import { Exam, CopySummary } from '@/lib/api';
 import { examsAPI, copiesAPI, correctionAPI } from '@/lib/api';
 import { useAuthStore } from '@/store/auth';
 import { toast } from 'sonner';
@@ -31,8 +31,8 @@ import { format } from 'date-fns';
 export default function GradingPage() {
   const [exams, setExams] = useState<Exam[]>([]);
   const [selectedExamId, setSelectedExamId] = useState<string>('');
-  const [copies, setCopies] = useState<Copy[]>([]);
-  const [filteredCopies, setFilteredCopies] = useState<Copy[]>([]);
+  const [copies, setCopies] = useState<CopySummary[]>([]);
+  const [filteredCopies, setFilteredCopies] = useState<CopySummary[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [isCorrecting, setIsCorrecting] = useState(false);
   const [isCorrectingAll, setIsCorrectingAll] = useState(false);
@@ -355,7 +355,7 @@ export default function GradingPage() {
 }
 
 interface CopiesListProps {
-  copies: Copy[];
+  copies: CopySummary[];
   examId: string;
   canGrade: boolean;
   onCorrectCopy: (copyId: string) => void;
@@ -400,15 +400,7 @@ function CopiesList({ copies, examId, canGrade, onCorrectCopy, isCorrecting }: C
                   <span className="font-medium">{copy.grade}%</span>
                 </div>
               )}
-              
-              {copy.annotations && (
-                <div className="flex items-center justify-between text-sm">
-                  <span className="text-gray-600">Annotations:</span>
-                  <span className="font-medium">
-                    {Object.keys(copy.annotations).length} items
-                  </span>
-                </div>
-              )}
+
               
               <div className="flex items-center justify-between pt-2">
                 <div className="flex items-center space-x-2">
@@ -13,6 +13,7 @@ import {
   GraduationCap
 } from 'lucide-react';
 import { useAuthStore } from '@/store/auth';
+import { authAPI } from '@/lib/api';
 import { Sheet, SheetContent, SheetTrigger } from '@/components/ui/sheet';
 import { Button } from '@/components/ui/button';
 import Link from 'next/link';
@@ -105,8 +106,8 @@ export default function DashboardLayout({ children }: DashboardLayoutProps) {
         </div>
         <button
           className="w-full py-2 px-4 bg-red-600 hover:bg-red-700 text-white rounded-lg text-sm font-semibold transition-colors"
-          onClick={() => {
-            localStorage.removeItem('access_token');
+          onClick={async () => {
+            await authAPI.logout();
             window.location.href = '/login';
           }}
         >
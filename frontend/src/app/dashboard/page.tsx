@@ -16,7 +16,7 @@ import {
   Eye
 } from 'lucide-react';
 import { examsAPI, copiesAPI } from '@/lib/api';
-import { Exam, Copy } from '@/lib/api';
+import { Exam, CopySummary } from '@/lib/api';
 import { useAuthStore } from '@/store/auth';
 import Link from 'next/link';
 import { toast } from 'sonner';
@@ -38,7 +38,7 @@ export default function DashboardPage() {
     averageGrade: 0,
   });
   const [recentExams, setRecentExams] = useState<Exam[]>([]);
-  const [recentCopies, setRecentCopies] = useState<Copy[]>([]);
+  const [recentCopies, setRecentCopies] = useState<CopySummary[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const { user } = useAuthStore();
 
@@ -55,7 +55,7 @@ export default function DashboardPage() {
       setRecentExams(exams.slice(0, 5));
 
       // Fetch copies for all exams
-      let allCopies: Copy[] = [];
+      let allCopies: CopySummary[] = [];
       for (const exam of exams) {
         const copies = await copiesAPI.getCopies(exam.id);
         allCopies = [...allCopies, ...copies];
@@ -19,6 +19,7 @@ import {
   DropdownMenuTrigger,
 } from '@/components/ui/dropdown-menu';
 import { useAuthStore } from '@/store/auth';
+import { authAPI } from '@/lib/api';
 
 interface NavbarProps {
   isAuthenticated?: boolean;
@@ -31,7 +32,8 @@ export default function Navbar({ isAuthenticated = false }: NavbarProps) {
 
   const isActive = (path: string) => pathname === path;
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
+    await authAPI.logout();
     logout();
     window.location.href = '/';
   };
@@ -25,12 +25,54 @@ api.interceptors.request.use(
   }
 );
 
+const clearTokens = () => {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+};
+
+// One refresh at a time: requests failing together wait for the same new token
+let refreshPromise: Promise<string> | null = null;
+
+const refreshAccessToken = (): Promise<string> => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? axios.post<LoginResponse>(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+          .then((response) => {
+            // Refresh tokens are single use, keep the rotated one
+            localStorage.setItem('access_token', response.data.access_token);
+            if (response.data.refresh_token) {
+              localStorage.setItem('refresh_token', response.data.refresh_token);
+            }
+            document.cookie = `access_token=${response.data.access_token}; path=/; max-age=86400; samesite=strict`;
+            return response.data.access_token;
+          })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
 // Add response interceptor to handle auth errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const request = error.config;
     if (error.response?.status === 401) {
-      localStorage.removeItem('access_token');
+      // An expired access token is renewed once, without asking for the password again
+      if (request && !request._retried && !request.url?.startsWith('/auth/')) {
+        request._retried = true;
+        try {
+          const token = await refreshAccessToken();
+          request.headers.Authorization = `Bearer ${token}`;
+          return api(request);
+        } catch {
+          // Fall through to the login page
+        }
+      }
+      clearTokens();
       window.location.href = '/login';
     }
     return Promise.reject(error);
@@ -47,6 +89,7 @@ export interface User {
 export interface LoginResponse {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
 }
 
 export interface Exam {
@@ -55,21 +98,29 @@ export interface Exam {
   date: string;
 }
 
-export interface Copy {
+// What the copy lists return
+export interface CopySummary {
   id: string;
   exam_id: string;
   file_path: string;
+  grade: number | null;
+}
+
+// A single copy, with the results of its correction
+export interface Copy extends CopySummary {
   file_url?: string;
   student_name?: string;
-  grade: number | null;
-  annotations: object | null;
+  annotations: Record<string, unknown> | null;
+  competencies?: Record<string, number> | null;
   status?: 'pending' | 'corrected' | 'reviewed';
 }
 
-export interface CorrectionResult {
-  id: string;
-  grade: number;
-  annotations: object;
+export interface ExtractedElement {
+  page: number;
+  reading_order: number;
+  label: string;
+  bbox: number[];
+  text: string;
 }
 
 // Auth API
@@ -87,10 +138,26 @@ export const authAPI = {
 
     // Store token in localStorage
     localStorage.setItem('access_token', response.data.access_token);
+    if (response.data.refresh_token) {
+      localStorage.setItem('refresh_token', response.data.refresh_token);
+    }
 
     return response.data;
   },
 
+  logout: async () => {
+    // Revoke the refresh token server side, the access token expires on its own
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      try {
+        await api.post('/auth/logout', { refresh_token: refreshToken });
+      } catch {
+        // Logged out locally anyway
+      }
+    }
+    clearTokens();
+  },
+
   getCurrentUser: async () => {
     const response = await api.get<User>('/auth/me');
     return response.data;
@@ -140,7 +207,7 @@ export const copiesAPI = {
   },
 
   getCopies: async (examId: string) => {
-    const response = await api.get<Copy[]>(`/exams/${examId}/copies`);
+    const response = await api.get<CopySummary[]>(`/exams/${examId}/copies`);
     return response.data;
   },
 
@@ -154,17 +221,24 @@ export const copiesAPI = {
     const response = await api.get<Copy>(`/exams/${examId}/copies/${copyId}`);
     return response.data;
   },
+
+  getCopyElements: async (examId: string, copyId: string, page?: number) => {
+    const response = await api.get<ExtractedElement[]>(`/exams/${examId}/copies/${copyId}/elements`, {
+      params: page !== undefined ? { page } : undefined,
+    });
+    return response.data;
+  },
 };
 
 // Correction API
 export const correctionAPI = {
   correctCopy: async (examId: string, copyId: string) => {
-    const response = await api.post<CorrectionResult>(`/exams/${examId}/copies/${copyId}/correct`);
+    const response = await api.post<Copy>(`/exams/${examId}/copies/${copyId}/correct`);
     return response.data;
   },
 
   correctAllCopies: async (examId: string) => {
-    const response = await api.post<CorrectionResult[]>(`/exams/${examId}/correct`);
+    const response = await api.post<CopySummary[]>(`/exams/${examId}/correct`);
     return response.data;
   },
 };
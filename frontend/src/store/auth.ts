@@ -25,6 +25,7 @@ export const useAuthStore = create<AuthState>()(
       },
       logout: () => {
         localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
         // Remove cookie
         document.cookie = 'access_token=; path=/; expires=Thu, 01 Jan 1970 00:00:01 GMT;';
         set({ user: null, token: null, isAuthenticated: false });